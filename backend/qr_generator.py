@@ -4,13 +4,19 @@ Replaces external qrcode-generator library with custom implementation
 """
 
 import math
-from typing import List, Tuple, Optional
+import functools
+from typing import Dict, List, Tuple, Optional
 from enum import Enum
 import base64
 from io import BytesIO
-from PIL import Image, ImageDraw
+from PIL import Image, ImageColor, ImageDraw
 import numpy as np
 
+try:
+    from numba import njit
+except ImportError:  # Numba is optional, the kernel below also runs as plain Python
+    njit = None
+
 class ErrorCorrectionLevel(Enum):
     L = 1  # Low (~7%)
     M = 2  # Medium (~15%)
@@ -23,22 +29,238 @@ class QRMode(Enum):
     BYTE = 3
     KANJI = 4
 
+class DataTooLongError(ValueError):
+    """Raised when the payload cannot be encoded in any supported QR version"""
+
+# 7x7 finder pattern stamped into three corners of the matrix
+FINDER_PATTERN = np.array([
+    [1, 1, 1, 1, 1, 1, 1],
+    [1, 0, 0, 0, 0, 0, 1],
+    [1, 0, 1, 1, 1, 0, 1],
+    [1, 0, 1, 1, 1, 0, 1],
+    [1, 0, 1, 1, 1, 0, 1],
+    [1, 0, 0, 0, 0, 0, 1],
+    [1, 1, 1, 1, 1, 1, 1],
+], dtype=np.uint8)
+
+# 5x5 alignment pattern, stamped at every combination of the version's
+# alignment coordinates that does not overlap a finder pattern
+ALIGNMENT_PATTERN = np.array([
+    [1, 1, 1, 1, 1],
+    [1, 0, 0, 0, 1],
+    [1, 0, 1, 0, 1],
+    [1, 0, 0, 0, 1],
+    [1, 1, 1, 1, 1],
+], dtype=np.uint8)
+
+# Row/column coordinates of the alignment pattern centres for each version
+ALIGNMENT_POSITIONS = {
+    1: [],
+    2: [6, 18],
+    3: [6, 22],
+    4: [6, 26],
+    5: [6, 30],
+    6: [6, 34],
+    7: [6, 22, 38],
+    8: [6, 24, 42],
+    9: [6, 26, 46],
+    10: [6, 28, 50],
+    11: [6, 30, 54],
+    12: [6, 32, 58],
+    13: [6, 34, 62],
+    14: [6, 26, 46, 66],
+    15: [6, 26, 48, 70],
+    16: [6, 26, 50, 74],
+    17: [6, 30, 54, 78],
+    18: [6, 30, 56, 82],
+    19: [6, 30, 58, 86],
+    20: [6, 34, 62, 90],
+    21: [6, 28, 50, 72, 94],
+    22: [6, 26, 50, 74, 98],
+    23: [6, 30, 54, 78, 102],
+    24: [6, 28, 54, 80, 106],
+    25: [6, 32, 58, 84, 110],
+    26: [6, 30, 58, 86, 114],
+    27: [6, 34, 62, 90, 118],
+    28: [6, 26, 50, 74, 98, 122],
+    29: [6, 30, 54, 78, 102, 126],
+    30: [6, 26, 52, 78, 104, 130],
+    31: [6, 30, 56, 82, 108, 134],
+    32: [6, 34, 60, 86, 112, 138],
+    33: [6, 30, 58, 86, 114, 142],
+    34: [6, 34, 62, 90, 118, 146],
+    35: [6, 30, 54, 78, 102, 126, 150],
+    36: [6, 24, 50, 76, 102, 128, 154],
+    37: [6, 28, 54, 80, 106, 132, 158],
+    38: [6, 32, 58, 84, 110, 136, 162],
+    39: [6, 26, 54, 82, 110, 138, 166],
+    40: [6, 30, 58, 86, 114, 142, 170],
+}
+
+# BCH generator polynomials and mask for the format and version information
+FORMAT_GENERATOR = 0b10100110111
+FORMAT_MASK = 0b101010000010010
+VERSION_GENERATOR = 0b1111100100101
+
+# Dark-light-dark pattern of a finder row with four light modules on either
+# side, the two shapes penalised by mask evaluation rule 3
+FINDER_LIKE_PATTERNS = np.array([
+    [1, 0, 1, 1, 1, 0, 1, 0, 0, 0, 0],
+    [0, 0, 0, 0, 1, 0, 1, 1, 1, 0, 1],
+], dtype=np.uint8)
+
+# Reed-Solomon block structure for versions 1-40: EC codewords per block and
+# (number of blocks, data codewords per block) groups
+EC_BLOCKS = {
+    1: {"L": (7, [(1, 19)]), "M": (10, [(1, 16)]), "Q": (13, [(1, 13)]), "H": (17, [(1, 9)])},
+    2: {"L": (10, [(1, 34)]), "M": (16, [(1, 28)]), "Q": (22, [(1, 22)]), "H": (28, [(1, 16)])},
+    3: {"L": (15, [(1, 55)]), "M": (26, [(1, 44)]), "Q": (18, [(2, 17)]), "H": (22, [(2, 13)])},
+    4: {"L": (20, [(1, 80)]), "M": (18, [(2, 32)]), "Q": (26, [(2, 24)]), "H": (16, [(4, 9)])},
+    5: {"L": (26, [(1, 108)]), "M": (24, [(2, 43)]), "Q": (18, [(2, 15), (2, 16)]), "H": (22, [(2, 11), (2, 12)])},
+    6: {"L": (18, [(2, 68)]), "M": (16, [(4, 27)]), "Q": (24, [(4, 19)]), "H": (28, [(4, 15)])},
+    7: {"L": (20, [(2, 78)]), "M": (18, [(4, 31)]), "Q": (18, [(2, 14), (4, 15)]), "H": (26, [(4, 13), (1, 14)])},
+    8: {"L": (24, [(2, 97)]), "M": (22, [(2, 38), (2, 39)]), "Q": (22, [(4, 18), (2, 19)]), "H": (26, [(4, 14), (2, 15)])},
+    9: {"L": (30, [(2, 116)]), "M": (22, [(3, 36), (2, 37)]), "Q": (20, [(4, 16), (4, 17)]), "H": (24, [(4, 12), (4, 13)])},
+    10: {"L": (18, [(2, 68), (2, 69)]), "M": (26, [(4, 43), (1, 44)]), "Q": (24, [(6, 19), (2, 20)]), "H": (28, [(6, 15), (2, 16)])},
+    11: {"L": (20, [(4, 81)]), "M": (30, [(1, 50), (4, 51)]), "Q": (28, [(4, 22), (4, 23)]), "H": (24, [(3, 12), (8, 13)])},
+    12: {"L": (24, [(2, 92), (2, 93)]), "M": (22, [(6, 36), (2, 37)]), "Q": (26, [(4, 20), (6, 21)]), "H": (28, [(7, 14), (4, 15)])},
+    13: {"L": (26, [(4, 107)]), "M": (22, [(8, 37), (1, 38)]), "Q": (24, [(8, 20), (4, 21)]), "H": (22, [(12, 11), (4, 12)])},
+    14: {"L": (30, [(3, 115), (1, 116)]), "M": (24, [(4, 40), (5, 41)]), "Q": (20, [(11, 16), (5, 17)]), "H": (24, [(11, 12), (5, 13)])},
+    15: {"L": (22, [(5, 87), (1, 88)]), "M": (24, [(5, 41), (5, 42)]), "Q": (30, [(5, 24), (7, 25)]), "H": (24, [(11, 12), (7, 13)])},
+    16: {"L": (24, [(5, 98), (1, 99)]), "M": (28, [(7, 45), (3, 46)]), "Q": (24, [(15, 19), (2, 20)]), "H": (30, [(3, 15), (13, 16)])},
+    17: {"L": (28, [(1, 107), (5, 108)]), "M": (28, [(10, 46), (1, 47)]), "Q": (28, [(1, 22), (15, 23)]), "H": (28, [(2, 14), (17, 15)])},
+    18: {"L": (30, [(5, 120), (1, 121)]), "M": (26, [(9, 43), (4, 44)]), "Q": (28, [(17, 22), (1, 23)]), "H": (28, [(2, 14), (19, 15)])},
+    19: {"L": (28, [(3, 113), (4, 114)]), "M": (26, [(3, 44), (11, 45)]), "Q": (26, [(17, 21), (4, 22)]), "H": (26, [(9, 13), (16, 14)])},
+    20: {"L": (28, [(3, 107), (5, 108)]), "M": (26, [(3, 41), (13, 42)]), "Q": (30, [(15, 24), (5, 25)]), "H": (28, [(15, 15), (10, 16)])},
+    21: {"L": (28, [(4, 116), (4, 117)]), "M": (26, [(17, 42)]), "Q": (28, [(17, 22), (6, 23)]), "H": (30, [(19, 16), (6, 17)])},
+    22: {"L": (28, [(2, 111), (7, 112)]), "M": (28, [(17, 46)]), "Q": (30, [(7, 24), (16, 25)]), "H": (24, [(34, 13)])},
+    23: {"L": (30, [(4, 121), (5, 122)]), "M": (28, [(4, 47), (14, 48)]), "Q": (30, [(11, 24), (14, 25)]), "H": (30, [(16, 15), (14, 16)])},
+    24: {"L": (30, [(6, 117), (4, 118)]), "M": (28, [(6, 45), (14, 46)]), "Q": (30, [(11, 24), (16, 25)]), "H": (30, [(30, 16), (2, 17)])},
+    25: {"L": (26, [(8, 106), (4, 107)]), "M": (28, [(8, 47), (13, 48)]), "Q": (30, [(7, 24), (22, 25)]), "H": (30, [(22, 15), (13, 16)])},
+    26: {"L": (28, [(10, 114), (2, 115)]), "M": (28, [(19, 46), (4, 47)]), "Q": (28, [(28, 22), (6, 23)]), "H": (30, [(33, 16), (4, 17)])},
+    27: {"L": (30, [(8, 122), (4, 123)]), "M": (28, [(22, 45), (3, 46)]), "Q": (30, [(8, 23), (26, 24)]), "H": (30, [(12, 15), (28, 16)])},
+    28: {"L": (30, [(3, 117), (10, 118)]), "M": (28, [(3, 45), (23, 46)]), "Q": (30, [(4, 24), (31, 25)]), "H": (30, [(11, 15), (31, 16)])},
+    29: {"L": (30, [(7, 116), (7, 117)]), "M": (28, [(21, 45), (7, 46)]), "Q": (30, [(1, 23), (37, 24)]), "H": (30, [(19, 15), (26, 16)])},
+    30: {"L": (30, [(5, 115), (10, 116)]), "M": (28, [(19, 47), (10, 48)]), "Q": (30, [(15, 24), (25, 25)]), "H": (30, [(23, 15), (25, 16)])},
+    31: {"L": (30, [(13, 115), (3, 116)]), "M": (28, [(2, 46), (29, 47)]), "Q": (30, [(42, 24), (1, 25)]), "H": (30, [(23, 15), (28, 16)])},
+    32: {"L": (30, [(17, 115)]), "M": (28, [(10, 46), (23, 47)]), "Q": (30, [(10, 24), (35, 25)]), "H": (30, [(19, 15), (35, 16)])},
+    33: {"L": (30, [(17, 115), (1, 116)]), "M": (28, [(14, 46), (21, 47)]), "Q": (30, [(29, 24), (19, 25)]), "H": (30, [(11, 15), (46, 16)])},
+    34: {"L": (30, [(13, 115), (6, 116)]), "M": (28, [(14, 46), (23, 47)]), "Q": (30, [(44, 24), (7, 25)]), "H": (30, [(59, 16), (1, 17)])},
+    35: {"L": (30, [(12, 121), (7, 122)]), "M": (28, [(12, 47), (26, 48)]), "Q": (30, [(39, 24), (14, 25)]), "H": (30, [(22, 15), (41, 16)])},
+    36: {"L": (30, [(6, 121), (14, 122)]), "M": (28, [(6, 47), (34, 48)]), "Q": (30, [(46, 24), (10, 25)]), "H": (30, [(2, 15), (64, 16)])},
+    37: {"L": (30, [(17, 122), (4, 123)]), "M": (28, [(29, 46), (14, 47)]), "Q": (30, [(49, 24), (10, 25)]), "H": (30, [(24, 15), (46, 16)])},
+    38: {"L": (30, [(4, 122), (18, 123)]), "M": (28, [(13, 46), (32, 47)]), "Q": (30, [(48, 24), (14, 25)]), "H": (30, [(42, 15), (32, 16)])},
+    39: {"L": (30, [(20, 117), (4, 118)]), "M": (28, [(40, 47), (7, 48)]), "Q": (30, [(43, 24), (22, 25)]), "H": (30, [(10, 15), (67, 16)])},
+    40: {"L": (30, [(19, 118), (6, 119)]), "M": (28, [(18, 47), (31, 48)]), "Q": (30, [(34, 24), (34, 25)]), "H": (30, [(20, 15), (61, 16)])}
+}
+
+# Symbol size and data capacity in bits for every version
+VERSION_INFO = {
+    version: {
+        "size": 17 + 4 * version,
+        "data_capacity": {
+            level: 8 * sum(count * size for count, size in groups)
+            for level, (_, groups) in levels.items()
+        },
+    }
+    for version, levels in EC_BLOCKS.items()
+}
+
+BYTE_MODE_INDICATOR = np.array([0, 1, 0, 0], dtype=np.uint8)
+
+def _count_bits(version: int) -> int:
+    """Length of the byte mode character count field for a version"""
+    return 8 if version < 10 else 16
+
+def _bch_code(data: int, generator: int, parity_bits: int) -> int:
+    """Append the BCH parity bits of data for the given generator polynomial"""
+    remainder = data << parity_bits
+    while remainder.bit_length() > parity_bits:
+        remainder ^= generator << (remainder.bit_length() - generator.bit_length())
+    return (data << parity_bits) | remainder
+
+def _build_gf_tables():
+    """Build GF(256) antilog/log tables for the QR primitive polynomial 0x11D"""
+    gf_exp = np.zeros(512, dtype=np.uint8)
+    gf_log = np.zeros(256, dtype=np.int16)
+    x = 1
+    for i in range(255):
+        gf_exp[i] = x
+        gf_log[x] = i
+        x <<= 1
+        if x & 0x100:
+            x ^= 0x11D
+    # Doubled so that log(a) + log(b) never needs a modulo
+    gf_exp[255:510] = gf_exp[:255]
+    return gf_exp, gf_log
+
+GF_EXP, GF_LOG = _build_gf_tables()
+
+# Full 256x256 GF(256) product table, MUL_TABLE[a, b] == a * b
+MUL_TABLE = GF_EXP[(GF_LOG[:, None] + GF_LOG[None, :]) % 255]
+MUL_TABLE[0, :] = 0
+MUL_TABLE[:, 0] = 0
+
+def _rs_remainder(data, generator):
+    """Divide data(x) * x^ec by the generator polynomial, returning the EC codewords"""
+    data_count = data.shape[0]
+    gen_count = generator.shape[0]
+    msg = np.zeros(data_count + gen_count - 1, dtype=np.uint8)
+    msg[:data_count] = data
+    
+    for i in range(data_count):
+        coef = msg[i]
+        if coef != 0:
+            msg[i + 1:i + gen_count] ^= MUL_TABLE[coef][generator[1:]]
+            
+    return msg[data_count:]
+
+@functools.lru_cache(maxsize=32)
+def _rs_parity_table(data_count: int, generator: Tuple[int, ...]) -> np.ndarray:
+    """EC codewords contributed by each byte value at each data position"""
+    gen = np.array(generator, dtype=np.uint8)
+    unit = np.zeros(data_count, dtype=np.uint8)
+    rows = []
+    for i in range(data_count):
+        unit[:] = 0
+        unit[i] = 1
+        rows.append(_rs_remainder(unit, gen))
+        
+    # table[i, b] == remainder of b * x^(data_count - 1 - i), shape (data_count, 256, ec_count)
+    table = np.ascontiguousarray(MUL_TABLE[:, np.array(rows)].transpose(1, 0, 2))
+    table.flags.writeable = False
+    return table
+
+def _rs_encode(data: np.ndarray, generator: Tuple[int, ...]) -> np.ndarray:
+    """Compute the EC codewords of a data block"""
+    # The remainder is linear over GF(256), so it is the XOR of every
+    # byte's precomputed contribution
+    table = _rs_parity_table(len(data), generator)
+    return np.bitwise_xor.reduce(table[np.arange(len(data)), data], axis=0)
+
+if njit is not None:
+    _rs_remainder = njit(cache=True, boundscheck=False)(_rs_remainder)
+    # Compile on import so the first request doesn't pay for it
+    _rs_remainder(np.zeros(1, dtype=np.uint8), np.ones(2, dtype=np.uint8))
+
 class QRGenerator:
+    # Zig-zag data placement order for each symbol size, shared by all instances
+    _TRAVERSAL_CACHE: Dict[int, np.ndarray] = {}
+    # The eight standard mask patterns for each symbol size, stacked (8, n, n)
+    _MASK_CACHE: Dict[int, np.ndarray] = {}
+    
     def __init__(self, version: int = 1, error_correction: ErrorCorrectionLevel = ErrorCorrectionLevel.H):
         self.version = version
         self.error_correction = error_correction
         self.modules = None
+        self._fmask = None
+        self.mask_pattern = 0
         self.module_count = 0
         self.data = ""
         
-        # Version info - simplified for common versions
-        self.version_info = {
-            1: {"size": 21, "data_capacity": {"L": 152, "M": 128, "Q": 104, "H": 72}},
-            2: {"size": 25, "data_capacity": {"L": 272, "M": 224, "Q": 176, "H": 128}},
-            3: {"size": 29, "data_capacity": {"L": 440, "M": 352, "Q": 272, "H": 208}},
-            4: {"size": 33, "data_capacity": {"L": 640, "M": 512, "Q": 384, "H": 288}},
-            5: {"size": 37, "data_capacity": {"L": 864, "M": 688, "Q": 496, "H": 368}},
-        }
+        # Version sizes/capacities and Reed-Solomon block structure
+        self.version_info = VERSION_INFO
+        self.ec_blocks = EC_BLOCKS
         
         # Generator polynomials for Reed-Solomon error correction
         self.generator_polynomials = {
@@ -48,7 +270,7 @@ class QRGenerator:
             15: [1, 29, 196, 111, 163, 112, 74, 10, 105, 105, 139, 132, 151, 32, 134, 26],
             16: [1, 59, 13, 104, 189, 68, 209, 30, 8, 163, 65, 41, 229, 98, 50, 36, 59],
             17: [1, 119, 66, 83, 120, 119, 22, 197, 83, 249, 41, 143, 134, 85, 53, 125, 99, 79],
-            18: [1, 239, 251, 183, 113, 149, 175, 199, 215, 240, 220, 141, 61, 82, 204, 8, 106, 128, 161],
+            18: [1, 239, 251, 183, 113, 149, 175, 199, 215, 240, 220, 73, 82, 173, 75, 32, 67, 217, 146],
             20: [1, 152, 185, 240, 5, 111, 99, 6, 220, 112, 150, 69, 36, 187, 22, 228, 198, 121, 121, 165, 174],
             22: [1, 89, 179, 131, 176, 182, 244, 19, 189, 69, 40, 28, 137, 29, 123, 67, 253, 86, 218, 230, 26, 145, 245],
             24: [1, 122, 118, 169, 70, 178, 237, 216, 102, 115, 150, 229, 73, 130, 72, 61, 43, 206, 1, 237, 247, 127, 217, 144, 117],
@@ -64,21 +286,22 @@ class QRGenerator:
     def make(self):
         """Generate the QR code matrix"""
         if not self.data:
-            raise ValueError("No data to encode")
+            raise DataTooLongError("No data to encode")
             
         # Determine optimal version based on data length
         self._optimize_version()
         
         # Initialize the matrix
         self.module_count = self.version_info[self.version]["size"]
-        self.modules = [[False for _ in range(self.module_count)] for _ in range(self.module_count)]
+        self.modules = np.zeros((self.module_count, self.module_count), dtype=np.uint8)
         
         # Place function patterns
         self._place_finder_patterns()
-        self._place_separators()
         self._place_timing_patterns()
+        self._place_alignment_patterns()
+        self._place_version_info()
         self._place_dark_module()
-        self._place_format_info()
+        self._build_function_mask()
         
         # Encode data
         encoded_data = self._encode_data()
@@ -89,93 +312,83 @@ class QRGenerator:
         # Place data in matrix
         self._place_data(error_corrected_data)
         
-        # Apply mask pattern
+        # Apply the best mask pattern, then record it in the format info
         self._apply_mask()
+        self._place_format_info()
         
     def _optimize_version(self):
-        """Determine the optimal QR version based on data length"""
+        """Pick the smallest QR version whose data capacity fits the payload"""
         data_length = len(self.data.encode('utf-8'))
         error_level = self.error_correction.name
         
-        for version in range(1, 6):  # Support versions 1-5
-            if version in self.version_info:
-                capacity = self.version_info[version]["data_capacity"][error_level]
-                if data_length <= capacity:
-                    self.version = version
-                    return
-                    
-        # If data is too long, use version 5
-        self.version = 5
+        for version, info in self.version_info.items():
+            # Mode indicator, character count, data and terminator, in bits
+            needed = 4 + _count_bits(version) + 8 * data_length + 4
+            if needed <= info["data_capacity"][error_level]:
+                self.version = version
+                return
+                
+        raise DataTooLongError(f"Data too long for a QR code: {data_length} bytes")
         
     def _place_finder_patterns(self):
         """Place finder patterns in corners"""
         positions = [(0, 0), (self.module_count - 7, 0), (0, self.module_count - 7)]
         
         for row, col in positions:
-            for r in range(7):
-                for c in range(7):
-                    if ((r == 0 or r == 6) and (0 <= c <= 6)) or \
-                       ((c == 0 or c == 6) and (0 <= r <= 6)) or \
-                       (2 <= r <= 4 and 2 <= c <= 4):
-                        # Check bounds before accessing
-                        if 0 <= row + r < self.module_count and 0 <= col + c < self.module_count:
-                            self.modules[row + r][col + c] = True
+            self.modules[row:row + 7, col:col + 7] = FINDER_PATTERN
                         
-    def _place_separators(self):
-        """Place separator patterns around finder patterns"""
-        positions = [(0, 0), (self.module_count - 7, 0), (0, self.module_count - 7)]
-        
-        for row, col in positions:
-            for r in range(8):
-                for c in range(8):
-                    if row + r < self.module_count and col + c < self.module_count:
-                        if r == 7 or c == 7:
-                            self.modules[row + r][col + c] = False
-                            
     def _place_timing_patterns(self):
         """Place timing patterns"""
-        for i in range(8, self.module_count - 8):
-            self.modules[6][i] = (i % 2 == 0)
-            self.modules[i][6] = (i % 2 == 0)
+        timing = np.arange(8, self.module_count - 8) % 2 == 0
+        self.modules[6, 8:self.module_count - 8] = timing
+        self.modules[8:self.module_count - 8, 6] = timing
+            
+    def _alignment_centers(self):
+        """Centres of the alignment patterns, skipping the three finder corners"""
+        positions = ALIGNMENT_POSITIONS[self.version]
+        if not positions:
+            return []
+        first, last = positions[0], positions[-1]
+        corners = {(first, first), (first, last), (last, first)}
+        return [(row, col) for row in positions for col in positions if (row, col) not in corners]
+        
+    def _place_alignment_patterns(self):
+        """Place alignment patterns (version 2 and up)"""
+        for row, col in self._alignment_centers():
+            self.modules[row - 2:row + 3, col - 2:col + 3] = ALIGNMENT_PATTERN
             
+    def _place_version_info(self):
+        """Place the two version information blocks (version 7 and up)"""
+        if self.version < 7:
+            return
+        n = self.module_count
+        bits = (_bch_code(self.version, VERSION_GENERATOR, 12) >> np.arange(18)) & 1
+        # Bit i goes to (i // 3, n - 11 + i % 3) and to its transpose
+        block = bits.reshape(6, 3).astype(np.uint8)
+        self.modules[:6, n - 11:n - 8] = block
+        self.modules[n - 11:n - 8, :6] = block.T
+        
     def _place_dark_module(self):
         """Place dark module"""
-        if self.module_count > 21:
-            self.modules[4 * self.version + 9][8] = True
+        self.modules[4 * self.version + 9, 8] = 1
             
     def _place_format_info(self):
-        """Place format information"""
-        # Simplified format info placement
-        format_info = self._generate_format_info()
+        """Place the format information next to the finder patterns"""
+        n = self.module_count
+        i = np.arange(15)
+        bits = ((self._generate_format_info() >> i) & 1).astype(np.uint8)
         
-        # Place format info around finder patterns
-        for i in range(15):
-            bit = (format_info >> i) & 1
-            
-            if i < 6:
-                if 8 < self.module_count and i < self.module_count:
-                    self.modules[8][i] = bit
-                if self.module_count - 1 - i >= 0 and 8 < self.module_count:
-                    self.modules[self.module_count - 1 - i][8] = bit
-            elif i < 8:
-                if 8 < self.module_count and i + 1 < self.module_count:
-                    self.modules[8][i + 1] = bit
-                if self.module_count - 7 + i >= 0 and self.module_count - 7 + i < self.module_count and 8 < self.module_count:
-                    self.modules[self.module_count - 7 + i][8] = bit
-            elif i < 9:
-                if 7 < self.module_count and 8 < self.module_count:
-                    self.modules[7][8] = bit
-                if 8 < self.module_count and self.module_count - 8 >= 0:
-                    self.modules[8][self.module_count - 8] = bit
-            else:
-                if 14 - i >= 0 and 8 < self.module_count:
-                    self.modules[14 - i][8] = bit
-                if 8 < self.module_count and self.module_count - 15 + i >= 0 and self.module_count - 15 + i < self.module_count:
-                    self.modules[8][self.module_count - 15 + i] = bit
+        # One copy down column 8, skipping the timing row, split between
+        # the top-left and bottom-left finders
+        rows = np.where(i < 6, i, np.where(i < 8, i + 1, n - 15 + i))
+        self.modules[rows, 8] = bits
+        
+        # The other along row 8, split between the top-right and top-left finders
+        cols = np.where(i < 8, n - 1 - i, np.where(i < 9, 7, 14 - i))
+        self.modules[8, cols] = bits
                 
     def _generate_format_info(self):
-        """Generate format information bits"""
-        # Simplified format info generation
+        """Generate the 15-bit BCH-protected format information"""
         error_level_bits = {
             ErrorCorrectionLevel.L: 0b01,
             ErrorCorrectionLevel.M: 0b00,
@@ -183,89 +396,191 @@ class QRGenerator:
             ErrorCorrectionLevel.H: 0b10
         }
         
-        mask_pattern = 0b000  # Using mask pattern 0 for simplicity
-        format_info = (error_level_bits[self.error_correction] << 3) | mask_pattern
-        
-        return format_info
+        data = (error_level_bits[self.error_correction] << 3) | self.mask_pattern
+        return _bch_code(data, FORMAT_GENERATOR, 10) ^ FORMAT_MASK
         
     def _encode_data(self):
         """Encode data using byte mode"""
         # Simple byte mode encoding
         data_bytes = self.data.encode('utf-8')
         
+        count_bits = _count_bits(self.version)
+        header_bits = 4 + count_bits
+        total_bits = header_bits + 8 * len(data_bytes)
+        encoded = np.empty(total_bits, dtype=np.uint8)
+        
         # Mode indicator (4 bits for byte mode = 0100)
-        encoded = [0, 1, 0, 0]
+        encoded[:4] = BYTE_MODE_INDICATOR
+        
+        # Character count (8 bits for versions 1-9, 16 bits from version 10)
+        count = np.array([len(data_bytes)], dtype='>u2').view(np.uint8)
+        encoded[4:header_bits] = np.unpackbits(count)[16 - count_bits:]
         
-        # Character count (8 bits for versions 1-9)
-        count = len(data_bytes)
-        for i in range(7, -1, -1):
-            encoded.append((count >> i) & 1)
-            
         # Data
-        for byte in data_bytes:
-            for i in range(7, -1, -1):
-                encoded.append((byte >> i) & 1)
-                
+        encoded[header_bits:] = np.unpackbits(np.frombuffer(data_bytes, dtype=np.uint8))
+        
         return encoded
         
     def _add_error_correction(self, data):
         """Add Reed-Solomon error correction"""
-        # Simplified error correction
-        # In a full implementation, this would use Reed-Solomon codes
-        return data
+        ec_count, groups = self.ec_blocks[self.version][self.error_correction.name]
+        data_codewords = sum(count * size for count, size in groups)
+        capacity = data_codewords * 8
+        
+        # Terminator and zero padding up to a byte boundary; the version was
+        # chosen so that the data always fits
+        bits = data
+        padding = min(4, capacity - len(bits))
+        padding += -(len(bits) + padding) % 8
+        codewords = np.packbits(np.concatenate([bits, np.zeros(padding, dtype=np.uint8)]))
+        
+        # Fill the remaining capacity with the alternating pad codewords
+        pad = np.resize(np.array([0xEC, 0x11], dtype=np.uint8), data_codewords - len(codewords))
+        codewords = np.concatenate([codewords, pad])
+        
+        generator = tuple(self.generator_polynomials[ec_count])
+        data_blocks = []
+        offset = 0
+        for count, size in groups:
+            for _ in range(count):
+                data_blocks.append(codewords[offset:offset + size])
+                offset += size
+        ec_blocks = [_rs_encode(block, generator) for block in data_blocks]
+        
+        # Interleave codewords across blocks, data first then error correction.
+        # Blocks in the second group can be one codeword longer, so read the
+        # data column-wise through a mask of the cells that are filled
+        longest = max(len(block) for block in data_blocks)
+        grid = np.zeros((len(data_blocks), longest), dtype=np.uint8)
+        filled = np.zeros((len(data_blocks), longest), dtype=bool)
+        for i, block in enumerate(data_blocks):
+            grid[i, :len(block)] = block
+            filled[i, :len(block)] = True
+            
+        interleaved = np.concatenate([grid.T[filled.T], np.stack(ec_blocks).T.ravel()])
+        return np.unpackbits(interleaved)
+        
+    def _traversal(self):
+        """(row, col) of every module in data placement order"""
+        n = self.module_count
+        order = self._TRAVERSAL_CACHE.get(n)
+        if order is None:
+            # Two-column strips from the right, alternating upwards and downwards
+            cells = []
+            upward = True
+            col = n - 1
+            while col > 0:
+                if col == 6:  # Skip timing column
+                    col -= 1
+                for i in range(n):
+                    row = n - 1 - i if upward else i
+                    cells.append((row, col))
+                    cells.append((row, col - 1))
+                upward = not upward
+                col -= 2
+            order = np.array(cells, dtype=np.int16)
+            order.flags.writeable = False
+            self._TRAVERSAL_CACHE[n] = order
+        return order
         
     def _place_data(self, data):
         """Place data bits in the matrix"""
-        # Simplified data placement
-        bit_index = 0
-        direction = -1  # -1 for up, 1 for down
+        rows, cols = self._traversal().T
+        positions = np.flatnonzero(~self._fmask[rows, cols])[:len(data)]
+        self.modules[rows[positions], cols[positions]] = data[:len(positions)]
+        
+    def _build_function_mask(self):
+        """Mark every module reserved for function patterns"""
+        n = self.module_count
+        fm = np.zeros((n, n), dtype=bool)
+        
+        # Finder patterns with their separators and format areas
+        fm[:9, :9] = True
+        fm[:9, n - 8:] = True
+        fm[n - 8:, :9] = True
         
-        for col in range(self.module_count - 1, 0, -2):
-            if col == 6:  # Skip timing column
-                col -= 1
-                
-            for _ in range(self.module_count):
-                for c in range(2):
-                    current_col = col - c
-                    
-                    if direction == -1:
-                        row = self.module_count - 1 - (_ % self.module_count)
-                    else:
-                        row = _ % self.module_count
-                        
-                    if not self._is_function_module(row, current_col):
-                        if bit_index < len(data):
-                            self.modules[row][current_col] = data[bit_index]
-                            bit_index += 1
-                            
-                direction *= -1
-                
-    def _is_function_module(self, row, col):
-        """Check if position contains a function pattern"""
-        # Finder patterns
-        if ((row < 9 and col < 9) or 
-            (row < 9 and col >= self.module_count - 8) or
-            (row >= self.module_count - 8 and col < 9)):
-            return True
-            
         # Timing patterns
-        if row == 6 or col == 6:
-            return True
+        fm[6, :] = True
+        fm[:, 6] = True
+        
+        # Alignment patterns
+        for row, col in self._alignment_centers():
+            fm[row - 2:row + 3, col - 2:col + 3] = True
             
+        # Version information blocks
+        if self.version >= 7:
+            fm[:6, n - 11:n - 8] = True
+            fm[n - 11:n - 8, :6] = True
+        
         # Dark module
-        if self.version > 1 and row == 4 * self.version + 9 and col == 8:
-            return True
+        fm[4 * self.version + 9, 8] = True
             
-        return False
+        self._fmask = fm
+        
+    def _is_function_module(self, row, col):
+        """Check if position contains a function pattern"""
+        return bool(self._fmask[row, col])
+        
+    def _mask_patterns(self):
+        """The eight mask patterns for the current size as a (8, n, n) array"""
+        n = self.module_count
+        masks = self._MASK_CACHE.get(n)
+        if masks is None:
+            i, j = np.indices((n, n))
+            masks = np.stack([
+                (i + j) % 2 == 0,
+                i % 2 == 0,
+                j % 3 == 0,
+                (i + j) % 3 == 0,
+                (i // 2 + j // 3) % 2 == 0,
+                (i * j) % 2 + (i * j) % 3 == 0,
+                ((i * j) % 2 + (i * j) % 3) % 2 == 0,
+                ((i + j) % 2 + (i * j) % 3) % 2 == 0,
+            ]).astype(np.uint8)
+            masks.flags.writeable = False
+            self._MASK_CACHE[n] = masks
+        return masks
+        
+    @staticmethod
+    def _mask_penalties(candidates):
+        """Penalty score of each (n, n) candidate in a (k, n, n) stack"""
+        k, n, _ = candidates.shape
+        # Rows and columns are scored the same way, so score both orientations
+        lines = np.concatenate([candidates, candidates.transpose(0, 2, 1)], axis=1)
+        
+        # Rule 1: runs of five or more same-coloured modules, 3 + (length - 5).
+        # A run of length L holds L - 4 windows of five, which gives L - 2
+        # once two points are added for every run that starts
+        same = lines[:, :, 1:] == lines[:, :, :-1]
+        five = same[:, :, :-3] & same[:, :, 1:-2] & same[:, :, 2:-1] & same[:, :, 3:]
+        starts = five[:, :, 0].sum(axis=1) + (five[:, :, 1:] & ~five[:, :, :-1]).sum(axis=(1, 2))
+        score = five.sum(axis=(1, 2)) + 2 * starts
+        
+        # Rule 2: 2x2 blocks of one colour
+        c = candidates
+        blocks = (c[:, :-1, :-1] == c[:, 1:, :-1]) & (c[:, :-1, :-1] == c[:, :-1, 1:]) & (c[:, :-1, :-1] == c[:, 1:, 1:])
+        score += 3 * blocks.sum(axis=(1, 2))
+        
+        # Rule 3: finder-like 1:1:3:1:1 patterns with four light modules on either side
+        windows = np.lib.stride_tricks.sliding_window_view(lines, 11, axis=2)
+        finder_like = (windows == FINDER_LIKE_PATTERNS[:, None, None, None, :]).all(axis=-1)
+        score += 40 * finder_like.sum(axis=(0, 2, 3))
+        
+        # Rule 4: 10 points for every 5% the dark share strays from 50%
+        dark = c.sum(axis=(1, 2), dtype=np.int64)
+        total = n * n
+        score += 10 * (np.abs(20 * dark - 10 * total) // total)
+        return score
         
     def _apply_mask(self):
-        """Apply mask pattern (simplified)"""
-        # Apply checkerboard mask pattern
-        for row in range(self.module_count):
-            for col in range(self.module_count):
-                if not self._is_function_module(row, col):
-                    if (row + col) % 2 == 0:
-                        self.modules[row][col] = not self.modules[row][col]
+        """Apply the mask pattern with the lowest penalty score"""
+        # Masks never touch function patterns
+        masks = self._mask_patterns() & ~self._fmask
+        candidates = self.modules[None, :, :] ^ masks
+        
+        self.mask_pattern = int(np.argmin(self._mask_penalties(candidates)))
+        # Copy so the other seven candidates can be freed
+        self.modules = candidates[self.mask_pattern].copy()
                         
     def get_module_count(self):
         """Get the size of the QR code matrix"""
@@ -274,7 +589,7 @@ class QRGenerator:
     def is_dark(self, row, col):
         """Check if a module is dark (True) or light (False)"""
         if 0 <= row < self.module_count and 0 <= col < self.module_count:
-            return self.modules[row][col]
+            return bool(self.modules[row, col])
         return False
 
 def generate_vcard(name: str, phone: str, email: str, company: str, title: str, url_work: str, url_home: str) -> str:
@@ -291,50 +606,69 @@ URL;TYPE=HOME:{url_home}
 END:VCARD"""
     return vcard_content
 
-def create_qr_image(qr_generator: QRGenerator, color: str = "#000000", 
-                   marker_shape: str = "square", dot_shape: str = "square",
-                   logo_base64: Optional[str] = None, logo_size: int = 30) -> str:
-    """Create QR code image and return as base64"""
+@functools.lru_cache(maxsize=256)
+def _parse_color(color: str) -> Tuple[int, int, int]:
+    """Parse a color string to RGB, defaulting to black if it is invalid"""
+    try:
+        rgb = ImageColor.getrgb(color)[:3]
+    except ValueError:
+        return (0, 0, 0)
+    # ImageColor accepts rgb() channels above 255, e.g. rgb(300,0,0)
+    if any(channel > 255 for channel in rgb):
+        return (0, 0, 0)
+    return rgb
+
+@functools.lru_cache(maxsize=32)
+def _shape_tile(shape: str, cell_size: int) -> np.ndarray:
+    """Rasterize a single module of the given shape as a boolean tile"""
+    if shape not in ("circle", "rounded"):
+        tile = np.ones((cell_size, cell_size), dtype=bool)
+    else:
+        mask = Image.new('L', (cell_size, cell_size), 0)
+        draw = ImageDraw.Draw(mask)
+        if shape == "circle":
+            draw.ellipse([0, 0, cell_size - 1, cell_size - 1], fill=255)
+        else:  # rounded
+            draw.rounded_rectangle([0, 0, cell_size - 1, cell_size - 1],
+                                   radius=cell_size / 4, fill=255)
+        tile = np.asarray(mask) > 0
+    
+    # Shared between calls through the cache
+    tile.flags.writeable = False
+    return tile
+
+def create_qr_png(qr_generator: QRGenerator, color: str = "#000000", 
+                  marker_shape: str = "square", dot_shape: str = "square",
+                  logo_base64: Optional[str] = None, logo_size: int = 30) -> bytes:
+    """Create QR code image and return the encoded PNG bytes"""
     
     # Validate and sanitize color
-    try:
-        # Try to parse the color - if it fails, use default black
-        from PIL import ImageColor
-        ImageColor.getrgb(color)
-    except:
-        color = "#000000"  # Default to black if color is invalid
+    color_rgb = _parse_color(color)
     
     module_count = qr_generator.get_module_count()
     size = 512
-    cell_size = size / module_count
+    # Whole-pixel cells, centred with the remainder left as a white border
+    cell_size = size // module_count
+    offset = (size - cell_size * module_count) // 2
     
-    # Create image
-    img = Image.new('RGB', (size, size), 'white')
-    draw = ImageDraw.Draw(img)
+    modules = qr_generator.modules.astype(bool)
+    rows, cols = np.indices(modules.shape)
+    is_finder = (((rows < 7) & (cols < 7)) |
+                 ((rows < 7) & (cols >= module_count - 7)) |
+                 ((rows >= module_count - 7) & (cols < 7)))
     
-    # Draw QR code modules
-    for row in range(module_count):
-        for col in range(module_count):
-            if qr_generator.is_dark(row, col):
-                x = col * cell_size
-                y = row * cell_size
-                
-                # Determine if this is a finder pattern
-                is_finder = ((row < 7 and col < 7) or 
-                           (row < 7 and col >= module_count - 7) or
-                           (row >= module_count - 7 and col < 7))
-                
-                shape = marker_shape if is_finder else dot_shape
-                
-                if shape == "circle":
-                    draw.ellipse([x, y, x + cell_size, y + cell_size], fill=color)
-                elif shape == "rounded":
-                    # Draw rounded rectangle
-                    radius = cell_size / 4
-                    draw.rounded_rectangle([x, y, x + cell_size, y + cell_size], 
-                                         radius=radius, fill=color)
-                else:  # square
-                    draw.rectangle([x, y, x + cell_size, y + cell_size], fill=color)
+    # Stamp the pre-rendered marker and dot tiles onto every dark module
+    coverage = (np.kron(modules & is_finder, _shape_tile(marker_shape, cell_size)) |
+                np.kron(modules & ~is_finder, _shape_tile(dot_shape, cell_size)))
+    
+    # Two-colour palette image: index 0 is the white background, 1 the QR colour
+    pixels = np.zeros((size, size), dtype=np.uint8)
+    span = cell_size * module_count
+    pixels[offset:offset + span, offset:offset + span][coverage] = 1
+    
+    # Create image
+    img = Image.fromarray(pixels)
+    img.putpalette([255, 255, 255, *color_rgb])
     
     # Add logo if provided
     if logo_base64:
@@ -354,16 +688,25 @@ def create_qr_image(qr_generator: QRGenerator, color: str = "#000000",
             logo_x = (size - logo_size_px) // 2
             logo_y = (size - logo_size_px) // 2
             
-            # Paste logo
+            # Paste logo, the logo's own colours need a full RGB canvas
+            img = img.convert('RGB')
             img.paste(logo_img, (logo_x, logo_y), logo_img if logo_img.mode == 'RGBA' else None)
             
         except Exception as e:
             print(f"Error adding logo: {e}")
     
-    # Convert to base64
+    # Without a logo this is written as a 1-bit PNG; a low zlib level is
+    # plenty for two-colour images and much cheaper than the default of 6
     buffer = BytesIO()
-    img.save(buffer, format='PNG')
-    img_str = base64.b64encode(buffer.getvalue()).decode()
+    img.save(buffer, format='PNG', compress_level=1)
+    return buffer.getvalue()
+
+def create_qr_image(qr_generator: QRGenerator, color: str = "#000000", 
+                   marker_shape: str = "square", dot_shape: str = "square",
+                   logo_base64: Optional[str] = None, logo_size: int = 30) -> str:
+    """Create QR code image and return as base64"""
+    png_data = create_qr_png(qr_generator, color, marker_shape, dot_shape, logo_base64, logo_size)
+    img_str = base64.b64encode(png_data).decode()
     
     return f"data:image/png;base64,{img_str}"
 
@@ -372,44 +715,56 @@ def create_qr_svg(qr_generator: QRGenerator, color: str = "#000000",
     """Create QR code as SVG"""
     
     # Validate and sanitize color
-    try:
-        from PIL import ImageColor
-        ImageColor.getrgb(color)
-    except:
-        color = "#000000"  # Default to black if color is invalid
+    color = '#%02x%02x%02x' % _parse_color(color)
     
     module_count = qr_generator.get_module_count()
     size = 512
     cell_size = size / module_count
     
-    svg_content = f'''<?xml version="1.0" encoding="UTF-8"?>
-<svg width="{size}" height="{size}" viewBox="0 0 {size} {size}" xmlns="http://www.w3.org/2000/svg">
+    parts = [f'''<?xml version="1.0" encoding="UTF-8"?>
+<svg width="{size}" height="{size}" viewBox="0 0 {size} {size}" xmlns="http://www.w3.org/2000/svg" xmlns:xlink="http://www.w3.org/1999/xlink">
 <rect width="{size}" height="{size}" fill="white"/>
-'''
+''']
     
+    # Circle and rounded modules are defined once and referenced with <use>.
+    # Ids carry the styling, so SVGs inlined into one page only share an id
+    # when their definitions are identical
+    shape_ids = {shape: f"qr-{shape}-{color[1:]}-{module_count}" for shape in ("circle", "rounded")}
+    used_shapes = {marker_shape, dot_shape}
+    if used_shapes & {"circle", "rounded"}:
+        parts.append('<defs>\n')
+        if "circle" in used_shapes:
+            radius = cell_size / 2
+            parts.append(f'<circle id="{shape_ids["circle"]}" cx="{radius}" cy="{radius}" r="{radius}" fill="{color}"/>\n')
+        if "rounded" in used_shapes:
+            radius = cell_size / 4
+            parts.append(f'<rect id="{shape_ids["rounded"]}" width="{cell_size}" height="{cell_size}" rx="{radius}" fill="{color}"/>\n')
+        parts.append('</defs>\n')
+    
+    modules = qr_generator.modules.astype(bool)
+    rows, cols = np.indices(modules.shape)
+    is_finder_mask = (((rows < 7) & (cols < 7)) |
+                      ((rows < 7) & (cols >= module_count - 7)) |
+                      ((rows >= module_count - 7) & (cols < 7)))
+    square_marker = marker_shape not in ("circle", "rounded")
+    square_dot = dot_shape not in ("circle", "rounded")
+    squares = modules & np.where(is_finder_mask, square_marker, square_dot)
+    
+    # Horizontal runs of square modules collapse into a single rect
     for row in range(module_count):
-        for col in range(module_count):
-            if qr_generator.is_dark(row, col):
-                x = col * cell_size
-                y = row * cell_size
-                
-                # Determine if this is a finder pattern
-                is_finder = ((row < 7 and col < 7) or 
-                           (row < 7 and col >= module_count - 7) or
-                           (row >= module_count - 7 and col < 7))
-                
-                shape = marker_shape if is_finder else dot_shape
-                
-                if shape == "circle":
-                    radius = cell_size / 2
-                    cx = x + radius
-                    cy = y + radius
-                    svg_content += f'<circle cx="{cx}" cy="{cy}" r="{radius}" fill="{color}"/>\n'
-                elif shape == "rounded":
-                    radius = cell_size / 4
-                    svg_content += f'<rect x="{x}" y="{y}" width="{cell_size}" height="{cell_size}" rx="{radius}" fill="{color}"/>\n'
-                else:  # square
-                    svg_content += f'<rect x="{x}" y="{y}" width="{cell_size}" height="{cell_size}" fill="{color}"/>\n'
+        y = row * cell_size
+        edges = np.flatnonzero(np.diff(np.r_[0, squares[row].astype(np.int8), 0]))
+        for start, end in zip(edges[::2], edges[1::2]):
+            x = start * cell_size
+            width = (end - start) * cell_size
+            parts.append(f'<rect x="{x}" y="{y}" width="{width}" height="{cell_size}" fill="{color}"/>\n')
+    
+    # Only visit the dark circle and rounded modules
+    dark = np.argwhere(modules & ~squares)
+    for (row, col), is_finder in zip(dark, is_finder_mask[dark[:, 0], dark[:, 1]]):
+        # SVG 2 href plus xlink:href for SVG 1.1 editors and print tools
+        ref = shape_ids[marker_shape if is_finder else dot_shape]
+        parts.append(f'<use href="#{ref}" xlink:href="#{ref}" x="{col * cell_size}" y="{row * cell_size}"/>\n')
     
-    svg_content += '</svg>'
-    return svg_content
\ No newline at end of file
+    parts.append('</svg>')
+    return ''.join(parts)
@@ -4,17 +4,31 @@ from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
+import asyncio
+import hashlib
 import logging
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from pathlib import Path
-from pydantic import BaseModel, Field
-from typing import List, Optional
+from pydantic import BaseModel, Field, conlist
+from typing import List, Optional, Tuple
 import uuid
 from datetime import datetime
 import base64
 from io import BytesIO
 
-from qr_generator import QRGenerator, ErrorCorrectionLevel, generate_vcard, create_qr_image, create_qr_svg
+import numpy as np
 
+from qr_generator import QRGenerator, ErrorCorrectionLevel, DataTooLongError, generate_vcard, create_qr_png, create_qr_svg
+
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -31,6 +45,7 @@ app = FastAPI()
 api_router = APIRouter(prefix="/api")
 
 
+
 # Define Models
 class StatusCheck(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -54,6 +69,11 @@ class QRCodeRequest(BaseModel):
     logo_base64: Optional[str] = None
     logo_size: int = 30
 
+# Batch endpoints queue every item on the worker pool at once, so bound how
+# much work a single request can submit; longer batches are rejected with 422
+MAX_BATCH_SIZE = 64
+QRCodeBatch = conlist(QRCodeRequest, max_length=MAX_BATCH_SIZE)
+
 class QRCodeResponse(BaseModel):
     qr_image_base64: str
     vcard_content: str
@@ -62,6 +82,86 @@ class QRCodeSVGResponse(BaseModel):
     svg_content: str
     vcard_content: str
 
+# QR matrices depend only on the vCard, rendered output also on the styling
+@lru_cache(maxsize=1024)
+def _qr_matrix(vcard_content: str) -> Tuple[bytes, int]:
+    """Encode vCard content and return the raw module matrix and its size"""
+    qr = QRGenerator(version=1, error_correction=ErrorCorrectionLevel.H)
+    qr.add_data(vcard_content)
+    qr.make()
+    return qr.modules.tobytes(), qr.module_count
+
+def _qr_from_matrix(matrix: bytes, module_count: int) -> QRGenerator:
+    """Rebuild a generator around a cached module matrix for the renderers"""
+    qr = QRGenerator(version=1, error_correction=ErrorCorrectionLevel.H)
+    qr.module_count = module_count
+    qr.modules = np.frombuffer(matrix, dtype=np.uint8).reshape(module_count, module_count)
+    return qr
+
+def _logo_digest(logo_base64: str) -> str:
+    """Short digest identifying a logo in the render cache key"""
+    return hashlib.blake2b(logo_base64.encode(), digest_size=16).hexdigest()
+
+def _render_png(matrix: bytes, module_count: int, color: str, marker_shape: str, dot_shape: str,
+                logo_base64: Optional[str], logo_size: int) -> bytes:
+    return create_qr_png(
+        qr_generator=_qr_from_matrix(matrix, module_count),
+        color=color,
+        marker_shape=marker_shape,
+        dot_shape=dot_shape,
+        logo_base64=logo_base64,
+        logo_size=logo_size
+    )
+
+# Per-worker LRU of rendered PNGs and their SHA-256. Logos are keyed by digest
+# so the cache holds 16-byte keys instead of whole (often multi-MB) logo data URLs
+_PNG_CACHE_SIZE = 256
+_png_cache: "OrderedDict[tuple, Tuple[bytes, str]]" = OrderedDict()
+
+@lru_cache(maxsize=256)
+def _render_svg(matrix: bytes, module_count: int, color: str, marker_shape: str, dot_shape: str) -> Tuple[bytes, str]:
+    svg_data = create_qr_svg(
+        qr_generator=_qr_from_matrix(matrix, module_count),
+        color=color,
+        marker_shape=marker_shape,
+        dot_shape=dot_shape
+    ).encode()
+    return svg_data, hashlib.sha256(svg_data).hexdigest()
+
+def _qr_png(vcard_content: str, color: str, marker_shape: str, dot_shape: str,
+            logo_base64: Optional[str], logo_size: int) -> Tuple[bytes, str]:
+    """Encode and render a QR code as PNG bytes and their SHA-256, reusing cached results"""
+    matrix, module_count = _qr_matrix(vcard_content)
+    key = (matrix, module_count, color, marker_shape, dot_shape,
+           _logo_digest(logo_base64) if logo_base64 else None, logo_size)
+    rendered = _png_cache.get(key)
+    if rendered is not None:
+        _png_cache.move_to_end(key)
+        return rendered
+    
+    png_data = _render_png(matrix, module_count, color, marker_shape, dot_shape, logo_base64, logo_size)
+    rendered = png_data, hashlib.sha256(png_data).hexdigest()
+    _png_cache[key] = rendered
+    if len(_png_cache) > _PNG_CACHE_SIZE:
+        _png_cache.popitem(last=False)
+    return rendered
+
+def _qr_svg(vcard_content: str, color: str, marker_shape: str, dot_shape: str) -> Tuple[bytes, str]:
+    """Encode and render a QR code as UTF-8 SVG and its SHA-256, reusing cached results"""
+    matrix, module_count = _qr_matrix(vcard_content)
+    return _render_svg(matrix, module_count, color, marker_shape, dot_shape)
+
+def _warmup_worker():
+    """Fill a worker's JIT and table caches before it takes real requests"""
+    _qr_matrix(generate_vcard("", "", "", "", "", "", ""))
+
+# Response header carrying the SHA-256 of the rendered image, so clients can
+# verify or compare QR codes without decoding them
+QR_HASH_HEADER = "X-QR-Sha256"
+
+# QR generation is CPU-bound, run it in worker processes instead of on the event loop
+executor = ProcessPoolExecutor(max_workers=os.cpu_count(), initializer=_warmup_worker)
+
 # Add your routes to the router instead of directly to app
 @api_router.get("/")
 async def root():
@@ -80,7 +180,7 @@ async def get_status_checks():
     return [StatusCheck(**status_check) for status_check in status_checks]
 
 @api_router.post("/qr-code", response_model=QRCodeResponse)
-async def generate_qr_code(request: QRCodeRequest):
+async def generate_qr_code(request: QRCodeRequest, response: Response):
     """Generate QR code with vCard data"""
     try:
         # Generate vCard content
@@ -94,30 +194,81 @@ async def generate_qr_code(request: QRCodeRequest):
             url_home=request.url_home
         )
         
-        # Create QR code generator
-        qr = QRGenerator(version=1, error_correction=ErrorCorrectionLevel.H)
-        qr.add_data(vcard_content)
-        qr.make()
-        
         # Create QR code image
-        qr_image_base64 = create_qr_image(
-            qr_generator=qr,
-            color=request.color,
-            marker_shape=request.marker_shape,
-            dot_shape=request.dot_shape,
-            logo_base64=request.logo_base64,
-            logo_size=request.logo_size
+        png_data, png_digest = await asyncio.get_running_loop().run_in_executor(
+            executor,
+            _qr_png,
+            vcard_content,
+            request.color,
+            request.marker_shape,
+            request.dot_shape,
+            request.logo_base64,
+            request.logo_size
         )
+        qr_image_base64 = f"data:image/png;base64,{base64.b64encode(png_data).decode()}"
+        response.headers[QR_HASH_HEADER] = png_digest
         
         return QRCodeResponse(
             qr_image_base64=qr_image_base64,
             vcard_content=vcard_content
         )
         
+    except DataTooLongError as e:
+        # The payload does not fit in any QR version
+        raise HTTPException(status_code=400, detail=f"Error generating QR code: {str(e)}")
     except Exception as e:
         logger.error(f"Error generating QR code: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error generating QR code: {str(e)}")
 
+@api_router.post("/qr-code-batch", response_model=List[QRCodeResponse])
+async def generate_qr_code_batch(batch: QRCodeBatch):
+    """Generate several vCard QR codes in one call"""
+    try:
+        # Generate vCard contents
+        vcard_contents = [
+            generate_vcard(
+                name=request.name,
+                phone=request.phone,
+                email=request.email,
+                company=request.company,
+                title=request.title,
+                url_work=request.url_work,
+                url_home=request.url_home
+            )
+            for request in batch
+        ]
+        
+        # Render all QR codes concurrently across the worker pool
+        loop = asyncio.get_running_loop()
+        png_results = await asyncio.gather(*(
+            loop.run_in_executor(
+                executor,
+                _qr_png,
+                vcard_content,
+                request.color,
+                request.marker_shape,
+                request.dot_shape,
+                request.logo_base64,
+                request.logo_size
+            )
+            for vcard_content, request in zip(vcard_contents, batch)
+        ))
+        
+        return [
+            QRCodeResponse(
+                qr_image_base64=f"data:image/png;base64,{base64.b64encode(png_data).decode()}",
+                vcard_content=vcard_content
+            )
+            for (png_data, _), vcard_content in zip(png_results, vcard_contents)
+        ]
+        
+    except DataTooLongError as e:
+        # The payload does not fit in any QR version
+        raise HTTPException(status_code=400, detail=f"Error generating QR code batch: {str(e)}")
+    except Exception as e:
+        logger.error(f"Error generating QR code batch: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error generating QR code batch: {str(e)}")
+
 @api_router.post("/qr-code-svg", response_model=QRCodeSVGResponse)
 async def generate_qr_code_svg(request: QRCodeRequest):
     """Generate QR code as SVG"""
@@ -133,28 +284,75 @@ async def generate_qr_code_svg(request: QRCodeRequest):
             url_home=request.url_home
         )
         
-        # Create QR code generator
-        qr = QRGenerator(version=1, error_correction=ErrorCorrectionLevel.H)
-        qr.add_data(vcard_content)
-        qr.make()
-        
         # Create QR code SVG
-        svg_content = create_qr_svg(
-            qr_generator=qr,
-            color=request.color,
-            marker_shape=request.marker_shape,
-            dot_shape=request.dot_shape
+        svg_data, _ = await asyncio.get_running_loop().run_in_executor(
+            executor,
+            _qr_svg,
+            vcard_content,
+            request.color,
+            request.marker_shape,
+            request.dot_shape
         )
         
         return QRCodeSVGResponse(
-            svg_content=svg_content,
+            svg_content=svg_data.decode(),
             vcard_content=vcard_content
         )
         
+    except DataTooLongError as e:
+        # The payload does not fit in any QR version
+        raise HTTPException(status_code=400, detail=f"Error generating QR code SVG: {str(e)}")
     except Exception as e:
         logger.error(f"Error generating QR code SVG: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error generating QR code SVG: {str(e)}")
 
+@api_router.post("/qr-code-svg-batch", response_model=List[QRCodeSVGResponse])
+async def generate_qr_code_svg_batch(batch: QRCodeBatch):
+    """Generate several vCard QR codes as SVG in one call"""
+    try:
+        # Generate vCard contents
+        vcard_contents = [
+            generate_vcard(
+                name=request.name,
+                phone=request.phone,
+                email=request.email,
+                company=request.company,
+                title=request.title,
+                url_work=request.url_work,
+                url_home=request.url_home
+            )
+            for request in batch
+        ]
+        
+        # Render all QR codes concurrently across the worker pool
+        loop = asyncio.get_running_loop()
+        svg_results = await asyncio.gather(*(
+            loop.run_in_executor(
+                executor,
+                _qr_svg,
+                vcard_content,
+                request.color,
+                request.marker_shape,
+                request.dot_shape
+            )
+            for vcard_content, request in zip(vcard_contents, batch)
+        ))
+        
+        return [
+            QRCodeSVGResponse(
+                svg_content=svg_data.decode(),
+                vcard_content=vcard_content
+            )
+            for (svg_data, _), vcard_content in zip(svg_results, vcard_contents)
+        ]
+        
+    except DataTooLongError as e:
+        # The payload does not fit in any QR version
+        raise HTTPException(status_code=400, detail=f"Error generating QR code SVG batch: {str(e)}")
+    except Exception as e:
+        logger.error(f"Error generating QR code SVG batch: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error generating QR code SVG batch: {str(e)}")
+
 @api_router.get("/download-png")
 async def download_png(
     name: str,
@@ -183,24 +381,18 @@ async def download_png(
             url_home=url_home
         )
         
-        # Create QR code generator
-        qr = QRGenerator(version=1, error_correction=ErrorCorrectionLevel.H)
-        qr.add_data(vcard_content)
-        qr.make()
-        
         # Create QR code image
-        qr_image_base64 = create_qr_image(
-            qr_generator=qr,
-            color=color,
-            marker_shape=marker_shape,
-            dot_shape=dot_shape,
-            logo_base64=logo_base64,
-            logo_size=logo_size
+        image_data, image_digest = await asyncio.get_running_loop().run_in_executor(
+            executor,
+            _qr_png,
+            vcard_content,
+            color,
+            marker_shape,
+            dot_shape,
+            logo_base64,
+            logo_size
         )
         
-        # Extract image data
-        image_data = base64.b64decode(qr_image_base64.split(',')[1])
-        
         # Create filename
         first_name = name.split(' ')[0] if name else 'QRCode'
         last_name = ''.join(name.split(' ')[1:]) if len(name.split(' ')) > 1 else ''
@@ -209,9 +401,17 @@ async def download_png(
         return Response(
             content=image_data,
             media_type="image/png",
-            headers={"Content-Disposition": f"attachment; filename={filename}"}
+            headers={
+                "Content-Disposition": f"attachment; filename={filename}",
+                # Same query always yields the same file
+                "Cache-Control": "public, max-age=600",
+                QR_HASH_HEADER: image_digest
+            }
         )
         
+    except DataTooLongError as e:
+        # The payload does not fit in any QR version
+        raise HTTPException(status_code=400, detail=f"Error downloading PNG: {str(e)}")
     except Exception as e:
         logger.error(f"Error downloading PNG: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error downloading PNG: {str(e)}")
@@ -242,17 +442,14 @@ async def download_svg(
             url_home=url_home
         )
         
-        # Create QR code generator
-        qr = QRGenerator(version=1, error_correction=ErrorCorrectionLevel.H)
-        qr.add_data(vcard_content)
-        qr.make()
-        
         # Create QR code SVG
-        svg_content = create_qr_svg(
-            qr_generator=qr,
-            color=color,
-            marker_shape=marker_shape,
-            dot_shape=dot_shape
+        svg_data, svg_digest = await asyncio.get_running_loop().run_in_executor(
+            executor,
+            _qr_svg,
+            vcard_content,
+            color,
+            marker_shape,
+            dot_shape
         )
         
         # Create filename
@@ -261,11 +458,19 @@ async def download_svg(
         filename = f"{first_name}{last_name}FoxVelocityCreation.svg"
         
         return Response(
-            content=svg_content,
+            content=svg_data,
             media_type="image/svg+xml",
-            headers={"Content-Disposition": f"attachment; filename={filename}"}
+            headers={
+                "Content-Disposition": f"attachment; filename={filename}",
+                # Same query always yields the same file
+                "Cache-Control": "public, max-age=600",
+                QR_HASH_HEADER: svg_digest
+            }
         )
         
+    except DataTooLongError as e:
+        # The payload does not fit in any QR version
+        raise HTTPException(status_code=400, detail=f"Error downloading SVG: {str(e)}")
     except Exception as e:
         logger.error(f"Error downloading SVG: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error downloading SVG: {str(e)}")
@@ -281,13 +486,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
-logger = logging.getLogger(__name__)
-
 @app.on_event("shutdown")
 async def shutdown_db_client():
     client.close()
+
+@app.on_event("shutdown")
+async def shutdown_executor():
+    executor.shutdown(wait=False)
@@ -4,62 +4,176 @@ Backend API Testing for QR Code Generator
 Tests all QR code generation endpoints with comprehensive scenarios
 """
 
-import requests
+import httpx  # see requirements-test.txt
 import json
 import base64
+import functools
+import hashlib
+import itertools
 import os
+import sys
 from io import BytesIO
 from PIL import Image
-import xml.etree.ElementTree as ET
+from xml.parsers import expat
+from concurrent.futures import ThreadPoolExecutor
 
-# Get backend URL from frontend .env file
-def get_backend_url():
-    try:
-        with open('/app/frontend/.env', 'r') as f:
-            for line in f:
-                if line.startswith('REACT_APP_BACKEND_URL='):
-                    return line.split('=', 1)[1].strip()
-    except:
-        pass
-    return "http://localhost:8001"
+from backend_url import get_backend_url
+
+try:
+    from orjson import dumps as _dumps
+except ImportError:  # orjson is optional, fall back to the stdlib encoder
+    def _dumps(payload):
+        return json.dumps(payload).encode()
 
 BASE_URL = get_backend_url()
 API_URL = f"{BASE_URL}/api"
 
 print(f"Testing backend at: {API_URL}")
 
+# One client shared by every test; with HTTP/2 the concurrent requests are
+# multiplexed over a single connection, otherwise it falls back to HTTP/1.1
+CLIENT = httpx.Client(
+    http2=True,
+    base_url=BASE_URL,
+    timeout=10.0,
+    limits=httpx.Limits(max_keepalive_connections=8, max_connections=32)
+)
+
+# Independent requests within a suite are sent concurrently over the pool
+POOL = ThreadPoolExecutor(max_workers=32)
+
+# Request bodies are encoded to JSON up front and sent as raw content
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+def submit_post(path, payload):
+    """Start a POST request in the background and return its future"""
+    body = payload if isinstance(payload, bytes) else _dumps(payload)
+    return POOL.submit(CLIENT.post, f"/api{path}", content=body, headers=JSON_HEADERS)
+
+# Downloads are streamed and only these many leading/trailing bytes are kept
+DOWNLOAD_HEAD_SIZE = 256
+DOWNLOAD_TAIL_SIZE = 12
+
+def _stream_download(path, params, on_chunk=None):
+    """GET a download chunk by chunk, keeping only its first and last bytes
+    and the SHA-256 of the whole body"""
+    head = b""
+    tail = b""
+    digest = hashlib.sha256()
+    with CLIENT.stream("GET", f"/api{path}", params=params) as response:
+        for chunk in response.iter_bytes():
+            if len(head) < DOWNLOAD_HEAD_SIZE:
+                head += chunk[:DOWNLOAD_HEAD_SIZE - len(head)]
+            tail = (tail + chunk)[-DOWNLOAD_TAIL_SIZE:]
+            digest.update(chunk)
+            if on_chunk is not None:
+                on_chunk(chunk)
+    return response, head, tail, digest.hexdigest()
+
+def submit_download(path, params, on_chunk=None):
+    """Start a streamed download in the background and return its future"""
+    return POOL.submit(_stream_download, path, params, on_chunk)
+
+# PNG signature and the fixed IEND chunk (empty data + CRC) every PNG ends with
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+PNG_IEND = b"\x00\x00\x00\x00IEND\xaeB`\x82"
+
+# Header with the SHA-256 of the rendered QR image
+QR_HASH_HEADER = "x-qr-sha256"
+
+# Shape and color matrices shared by the suites, built once at import
+SHAPES = ("square", "circle", "rounded")
+SHAPE_PAIRS = tuple(itertools.product(SHAPES, SHAPES))
+COLORS_TO_TEST = ("#ff0000", "#00ff00", "#0000ff", "#ffff00", "#ff00ff")
+
+COLOR_PAYLOADS = tuple(
+    {
+        "name": "Test User",
+        "color": color,
+        "marker_shape": "square",
+        "dot_shape": "square"
+    }
+    for color in COLORS_TO_TEST
+)
+SHAPE_PAYLOADS = tuple(
+    {
+        "name": "Test User",
+        "color": "#000000",
+        "marker_shape": marker_shape,
+        "dot_shape": dot_shape
+    }
+    for marker_shape, dot_shape in SHAPE_PAIRS
+)
+SVG_SHAPE_PAYLOADS = tuple(
+    {
+        "name": "Test User",
+        "marker_shape": shape,
+        "dot_shape": shape,
+        "color": "#333333"
+    }
+    for shape in SHAPES
+)
+
+# The batch payloads never change, so their bodies are encoded only once
+COLOR_BATCH_BODY = _dumps(COLOR_PAYLOADS)
+SHAPE_BATCH_BODY = _dumps(SHAPE_PAYLOADS)
+SVG_SHAPE_BATCH_BODY = _dumps(SVG_SHAPE_PAYLOADS)
+
 class QRCodeTester:
+    __slots__ = ("passed", "failed", "errors", "_buf")
+    
     def __init__(self):
         self.passed = 0
         self.failed = 0
         self.errors = []
+        # Result lines are buffered and written out in one go by flush()
+        self._buf = []
         
     def test_result(self, test_name, success, message=""):
         if success:
-            print(f"✅ {test_name}")
+            self._buf.append(f"✅ {test_name}")
             self.passed += 1
         else:
-            print(f"❌ {test_name}: {message}")
+            self._buf.append(f"❌ {test_name}: {message}")
             self.failed += 1
             self.errors.append(f"{test_name}: {message}")
             
-    def summary(self):
-        print(f"\n{'='*60}")
-        print(f"TEST SUMMARY")
-        print(f"{'='*60}")
-        print(f"Passed: {self.passed}")
-        print(f"Failed: {self.failed}")
-        print(f"Total: {self.passed + self.failed}")
-        
-        if self.errors:
-            print(f"\nERRORS:")
-            for error in self.errors:
-                print(f"  - {error}")
+    def flush(self, header=None):
+        """Write the buffered result lines, after an optional header"""
+        lines = [header] if header is not None else []
+        lines.extend(self._buf)
+        self._buf.clear()
+        sys.stdout.write("\n".join(lines) + "\n")
+        sys.stdout.flush()
+
+class XMLCheck:
+    """Incremental well-formedness check, fed one chunk at a time"""
+    
+    def __init__(self):
+        self.parser = expat.ParserCreate()
+        self.error = ""
         
-        return self.failed == 0
+    def feed(self, chunk, final=False):
+        if self.error:
+            return
+        try:
+            self.parser.Parse(chunk, final)
+        except expat.ExpatError as e:
+            self.error = str(e)
+
+def _svg_wellformed(svg_content):
+    """Check that an SVG document is well-formed XML without building a tree"""
+    check = XMLCheck()
+    check.feed(svg_content, True)
+    return not check.error, check.error
 
+# Every suite records into this one tester; results are checked on the main
+# thread only, so no locking is needed
+TESTER = QRCodeTester()
+
+@functools.lru_cache(maxsize=1)
 def create_sample_logo_base64():
-    """Create a simple test logo in base64 format"""
+    """Create a simple test logo in base64 format (built once, then cached)"""
     # Create a simple 50x50 red circle
     img = Image.new('RGBA', (50, 50), (255, 255, 255, 0))
     from PIL import ImageDraw
@@ -73,77 +187,98 @@ def create_sample_logo_base64():
 
 def test_basic_connectivity():
     """Test basic API connectivity"""
-    tester = QRCodeTester()
-    
     try:
-        response = requests.get(f"{API_URL}/", timeout=10)
-        tester.test_result("Basic API connectivity", 
+        response = CLIENT.get("/api/")
+        TESTER.test_result("Basic API connectivity", 
                           response.status_code == 200,
                           f"Status: {response.status_code}")
     except Exception as e:
-        tester.test_result("Basic API connectivity", False, str(e))
-    
-    return tester
+        TESTER.test_result("Basic API connectivity", False, str(e))
 
 def test_qr_code_generation():
     """Test POST /api/qr-code endpoint"""
-    tester = QRCodeTester()
+    # Send every request up front, then check the responses in order
+    empty_payload = {
+        "name": "",
+        "phone": "",
+        "email": "",
+        "company": "",
+        "title": "",
+        "url_work": "",
+        "url_home": "",
+        "color": "#000000",
+        "marker_shape": "square",
+        "dot_shape": "square"
+    }
+    empty_body = _dumps(empty_payload)
+    empty_future = submit_post("/qr-code", empty_body)
+    # Same body again: the image hash must not depend on which worker rendered it
+    empty_again_future = submit_post("/qr-code", empty_body)
+    
+    full_payload = {
+        "name": "Jean Dupont",
+        "phone": "+33 1 23 45 67 89",
+        "email": "jean.dupont@example.com",
+        "company": "FoxVelocity Creation",
+        "title": "Développeur Senior",
+        "url_work": "https://foxvelocity.com",
+        "url_home": "https://jeandupont.fr",
+        "color": "#ff0000",
+        "marker_shape": "circle",
+        "dot_shape": "rounded"
+    }
+    full_future = submit_post("/qr-code", full_payload)
+    
+    # Color and shape variants each go out as a single batch request
+    color_future = submit_post("/qr-code-batch", COLOR_BATCH_BODY)
+    shape_future = submit_post("/qr-code-batch", SHAPE_BATCH_BODY)
+    
+    logo_payload = {
+        "name": "Test User",
+        "color": "#000000",
+        "marker_shape": "square",
+        "dot_shape": "square",
+        "logo_base64": create_sample_logo_base64(),
+        "logo_size": 25
+    }
+    logo_future = submit_post("/qr-code", logo_payload)
     
     # Test 1: Empty form data
     try:
-        payload = {
-            "name": "",
-            "phone": "",
-            "email": "",
-            "company": "",
-            "title": "",
-            "url_work": "",
-            "url_home": "",
-            "color": "#000000",
-            "marker_shape": "square",
-            "dot_shape": "square"
-        }
-        
-        response = requests.post(f"{API_URL}/qr-code", json=payload, timeout=10)
-        tester.test_result("QR Code generation with empty data", 
+        response = empty_future.result()
+        TESTER.test_result("QR Code generation with empty data", 
                           response.status_code == 200,
                           f"Status: {response.status_code}")
         
         if response.status_code == 200:
             data = response.json()
-            tester.test_result("Response contains qr_image_base64", 
+            TESTER.test_result("Response contains qr_image_base64", 
                               "qr_image_base64" in data,
                               "Missing qr_image_base64 field")
-            tester.test_result("Response contains vcard_content", 
+            TESTER.test_result("Response contains vcard_content", 
                               "vcard_content" in data,
                               "Missing vcard_content field")
             
             # Validate base64 image format
             if "qr_image_base64" in data:
-                tester.test_result("QR image is valid base64", 
+                TESTER.test_result("QR image is valid base64", 
                                   data["qr_image_base64"].startswith("data:image/png;base64,"),
                                   "Invalid base64 image format")
+            
+            # Identical requests must produce the identical image
+            first_hash = response.headers.get(QR_HASH_HEADER, '')
+            second_hash = empty_again_future.result().headers.get(QR_HASH_HEADER, '')
+            TESTER.test_result("QR image hash is deterministic", 
+                              bool(first_hash) and first_hash == second_hash,
+                              f"Hashes: {first_hash!r} vs {second_hash!r}")
                 
     except Exception as e:
-        tester.test_result("QR Code generation with empty data", False, str(e))
+        TESTER.test_result("QR Code generation with empty data", False, str(e))
     
     # Test 2: Full form data
     try:
-        payload = {
-            "name": "Jean Dupont",
-            "phone": "+33 1 23 45 67 89",
-            "email": "jean.dupont@example.com",
-            "company": "FoxVelocity Creation",
-            "title": "Développeur Senior",
-            "url_work": "https://foxvelocity.com",
-            "url_home": "https://jeandupont.fr",
-            "color": "#ff0000",
-            "marker_shape": "circle",
-            "dot_shape": "rounded"
-        }
-        
-        response = requests.post(f"{API_URL}/qr-code", json=payload, timeout=10)
-        tester.test_result("QR Code generation with full data", 
+        response = full_future.result()
+        TESTER.test_result("QR Code generation with full data", 
                           response.status_code == 200,
                           f"Status: {response.status_code}")
         
@@ -151,359 +286,370 @@ def test_qr_code_generation():
             data = response.json()
             # Validate vCard content
             vcard = data.get("vcard_content", "")
-            tester.test_result("vCard contains name", 
+            TESTER.test_result("vCard contains name", 
                               "Jean Dupont" in vcard,
                               "Name not found in vCard")
-            tester.test_result("vCard contains email", 
+            TESTER.test_result("vCard contains email", 
                               "jean.dupont@example.com" in vcard,
                               "Email not found in vCard")
-            tester.test_result("vCard contains company", 
+            TESTER.test_result("vCard contains company", 
                               "FoxVelocity Creation" in vcard,
                               "Company not found in vCard")
             
     except Exception as e:
-        tester.test_result("QR Code generation with full data", False, str(e))
+        TESTER.test_result("QR Code generation with full data", False, str(e))
     
     # Test 3: Different colors
-    colors_to_test = ["#ff0000", "#00ff00", "#0000ff", "#ffff00", "#ff00ff"]
-    for color in colors_to_test:
-        try:
-            payload = {
-                "name": "Test User",
-                "color": color,
-                "marker_shape": "square",
-                "dot_shape": "square"
-            }
-            
-            response = requests.post(f"{API_URL}/qr-code", json=payload, timeout=10)
-            tester.test_result(f"QR Code generation with color {color}", 
-                              response.status_code == 200,
+    try:
+        response = color_future.result()
+        results = response.json() if response.status_code == 200 else []
+        for i, color in enumerate(COLORS_TO_TEST):
+            TESTER.test_result(f"QR Code generation with color {color}", 
+                              i < len(results) and "qr_image_base64" in results[i],
                               f"Status: {response.status_code}")
-        except Exception as e:
-            tester.test_result(f"QR Code generation with color {color}", False, str(e))
+    except Exception as e:
+        TESTER.test_result("QR Code generation with colors batch", False, str(e))
     
     # Test 4: Different shapes
-    shapes = ["square", "circle", "rounded"]
-    for marker_shape in shapes:
-        for dot_shape in shapes:
-            try:
-                payload = {
-                    "name": "Test User",
-                    "color": "#000000",
-                    "marker_shape": marker_shape,
-                    "dot_shape": dot_shape
-                }
-                
-                response = requests.post(f"{API_URL}/qr-code", json=payload, timeout=10)
-                tester.test_result(f"QR Code with marker:{marker_shape}, dot:{dot_shape}", 
-                                  response.status_code == 200,
-                                  f"Status: {response.status_code}")
-            except Exception as e:
-                tester.test_result(f"QR Code with marker:{marker_shape}, dot:{dot_shape}", False, str(e))
+    try:
+        response = shape_future.result()
+        results = response.json() if response.status_code == 200 else []
+        for i, (marker_shape, dot_shape) in enumerate(SHAPE_PAIRS):
+            TESTER.test_result(f"QR Code with marker:{marker_shape}, dot:{dot_shape}", 
+                              i < len(results) and "qr_image_base64" in results[i],
+                              f"Status: {response.status_code}")
+    except Exception as e:
+        TESTER.test_result("QR Code with shapes batch", False, str(e))
     
     # Test 5: Logo upload
     try:
-        logo_base64 = create_sample_logo_base64()
-        payload = {
-            "name": "Test User",
-            "color": "#000000",
-            "marker_shape": "square",
-            "dot_shape": "square",
-            "logo_base64": logo_base64,
-            "logo_size": 25
-        }
-        
-        response = requests.post(f"{API_URL}/qr-code", json=payload, timeout=10)
-        tester.test_result("QR Code generation with logo", 
+        response = logo_future.result()
+        TESTER.test_result("QR Code generation with logo", 
                           response.status_code == 200,
                           f"Status: {response.status_code}")
     except Exception as e:
-        tester.test_result("QR Code generation with logo", False, str(e))
-    
-    return tester
+        TESTER.test_result("QR Code generation with logo", False, str(e))
 
 def test_qr_code_svg_generation():
     """Test POST /api/qr-code-svg endpoint"""
-    tester = QRCodeTester()
+    # Send every request up front, then check the responses in order
+    basic_payload = {
+        "name": "Marie Martin",
+        "phone": "+33 6 12 34 56 78",
+        "email": "marie.martin@example.fr",
+        "company": "Tech Solutions",
+        "title": "Chef de Projet",
+        "color": "#0066cc",
+        "marker_shape": "rounded",
+        "dot_shape": "circle"
+    }
+    basic_future = submit_post("/qr-code-svg", basic_payload)
+    
+    shape_future = submit_post("/qr-code-svg-batch", SVG_SHAPE_BATCH_BODY)
     
     # Test 1: Basic SVG generation
     try:
-        payload = {
-            "name": "Marie Martin",
-            "phone": "+33 6 12 34 56 78",
-            "email": "marie.martin@example.fr",
-            "company": "Tech Solutions",
-            "title": "Chef de Projet",
-            "color": "#0066cc",
-            "marker_shape": "rounded",
-            "dot_shape": "circle"
-        }
-        
-        response = requests.post(f"{API_URL}/qr-code-svg", json=payload, timeout=10)
-        tester.test_result("SVG QR Code generation", 
+        response = basic_future.result()
+        TESTER.test_result("SVG QR Code generation", 
                           response.status_code == 200,
                           f"Status: {response.status_code}")
         
         if response.status_code == 200:
             data = response.json()
-            tester.test_result("SVG response contains svg_content", 
+            TESTER.test_result("SVG response contains svg_content", 
                               "svg_content" in data,
                               "Missing svg_content field")
-            tester.test_result("SVG response contains vcard_content", 
+            TESTER.test_result("SVG response contains vcard_content", 
                               "vcard_content" in data,
                               "Missing vcard_content field")
             
             # Validate SVG content
             if "svg_content" in data:
                 svg_content = data["svg_content"]
-                tester.test_result("SVG content is valid XML", 
+                TESTER.test_result("SVG content is valid XML", 
                                   svg_content.startswith('<?xml') and '<svg' in svg_content,
                                   "Invalid SVG format")
                 
-                # Try to parse SVG as XML
-                try:
-                    ET.fromstring(svg_content)
-                    tester.test_result("SVG is well-formed XML", True)
-                except ET.ParseError as e:
-                    tester.test_result("SVG is well-formed XML", False, str(e))
+                # Stream the SVG through the XML parser
+                wellformed, error = _svg_wellformed(svg_content)
+                TESTER.test_result("SVG is well-formed XML", wellformed, error)
                     
     except Exception as e:
-        tester.test_result("SVG QR Code generation", False, str(e))
+        TESTER.test_result("SVG QR Code generation", False, str(e))
     
     # Test 2: Different shapes in SVG
-    shapes = ["square", "circle", "rounded"]
-    for shape in shapes:
-        try:
-            payload = {
-                "name": "Test User",
-                "marker_shape": shape,
-                "dot_shape": shape,
-                "color": "#333333"
-            }
-            
-            response = requests.post(f"{API_URL}/qr-code-svg", json=payload, timeout=10)
-            tester.test_result(f"SVG QR Code with {shape} shapes", 
-                              response.status_code == 200,
+    try:
+        response = shape_future.result()
+        results = response.json() if response.status_code == 200 else []
+        for i, shape in enumerate(SHAPES):
+            TESTER.test_result(f"SVG QR Code with {shape} shapes", 
+                              i < len(results) and "svg_content" in results[i],
                               f"Status: {response.status_code}")
-        except Exception as e:
-            tester.test_result(f"SVG QR Code with {shape} shapes", False, str(e))
-    
-    return tester
+    except Exception as e:
+        TESTER.test_result("SVG QR Code with shapes batch", False, str(e))
 
 def test_png_download():
     """Test GET /api/download-png endpoint"""
-    tester = QRCodeTester()
+    # Send every request up front, then check the responses in order
+    basic_params = {
+        "name": "Pierre Durand",
+        "phone": "+33 1 98 76 54 32",
+        "email": "pierre.durand@example.com",
+        "company": "Innovation Labs",
+        "title": "Ingénieur Logiciel",
+        "color": "#008000",
+        "marker_shape": "square",
+        "dot_shape": "circle"
+    }
+    basic_future = submit_download("/download-png", basic_params)
+    
+    logo_params = {
+        "name": "Sophie Leblanc",
+        "email": "sophie@example.fr",
+        "color": "#ff6600",
+        "logo_base64": create_sample_logo_base64(),
+        "logo_size": "20"
+    }
+    logo_future = submit_download("/download-png", logo_params)
     
-    # Test 1: Basic PNG download
-    try:
+    test_cases = [
+        {"color": "#ff0000", "marker_shape": "circle", "dot_shape": "square"},
+        {"color": "#00ff00", "marker_shape": "rounded", "dot_shape": "circle"},
+        {"color": "#0000ff", "marker_shape": "square", "dot_shape": "rounded"}
+    ]
+    case_futures = []
+    for i, case in enumerate(test_cases):
         params = {
-            "name": "Pierre Durand",
-            "phone": "+33 1 98 76 54 32",
-            "email": "pierre.durand@example.com",
-            "company": "Innovation Labs",
-            "title": "Ingénieur Logiciel",
-            "color": "#008000",
-            "marker_shape": "square",
-            "dot_shape": "circle"
+            "name": f"Test User {i+1}",
+            **case
         }
-        
-        response = requests.get(f"{API_URL}/download-png", params=params, timeout=10)
-        tester.test_result("PNG download", 
+        case_futures.append(submit_download("/download-png", params))
+    
+    # Test 1: Basic PNG download
+    try:
+        response, head, tail, digest = basic_future.result()
+        TESTER.test_result("PNG download", 
                           response.status_code == 200,
                           f"Status: {response.status_code}")
         
         if response.status_code == 200:
-            tester.test_result("PNG content type", 
+            TESTER.test_result("PNG content type", 
                               response.headers.get('content-type') == 'image/png',
                               f"Content-Type: {response.headers.get('content-type')}")
             
             # Check filename in Content-Disposition header
             content_disposition = response.headers.get('content-disposition', '')
-            tester.test_result("PNG filename contains FoxVelocityCreation", 
+            TESTER.test_result("PNG filename contains FoxVelocityCreation", 
                               'FoxVelocityCreation.png' in content_disposition,
                               f"Content-Disposition: {content_disposition}")
             
-            # Validate PNG content
-            try:
-                img = Image.open(BytesIO(response.content))
-                tester.test_result("PNG is valid image", 
-                                  img.format == 'PNG',
-                                  f"Image format: {img.format}")
-            except Exception as e:
-                tester.test_result("PNG is valid image", False, str(e))
+            # Downloads are deterministic, so clients may cache them
+            cache_control = response.headers.get('cache-control', '')
+            TESTER.test_result("PNG download is cacheable", 
+                              'public' in cache_control and 'max-age' in cache_control,
+                              f"Cache-Control: {cache_control}")
+            
+            # Validate PNG content from its signature and IEND trailer,
+            # no need to inflate the whole image
+            TESTER.test_result("PNG is valid image", 
+                              head.startswith(PNG_SIGNATURE) and tail == PNG_IEND,
+                              f"Header: {head[:8]!r}, trailer: {tail!r}")
+            
+            # The server announces the hash of the body it sent
+            expected = response.headers.get(QR_HASH_HEADER, '')
+            TESTER.test_result("PNG download matches X-QR-Sha256", 
+                              digest == expected,
+                              f"Header: {expected}, body: {digest}")
                 
     except Exception as e:
-        tester.test_result("PNG download", False, str(e))
+        TESTER.test_result("PNG download", False, str(e))
     
     # Test 2: PNG download with logo
     try:
-        logo_base64 = create_sample_logo_base64()
-        params = {
-            "name": "Sophie Leblanc",
-            "email": "sophie@example.fr",
-            "color": "#ff6600",
-            "logo_base64": logo_base64,
-            "logo_size": "20"
-        }
-        
-        response = requests.get(f"{API_URL}/download-png", params=params, timeout=10)
-        tester.test_result("PNG download with logo", 
+        response, _, _, _ = logo_future.result()
+        TESTER.test_result("PNG download with logo", 
                           response.status_code == 200,
                           f"Status: {response.status_code}")
     except Exception as e:
-        tester.test_result("PNG download with logo", False, str(e))
+        TESTER.test_result("PNG download with logo", False, str(e))
     
     # Test 3: Different colors and shapes
-    test_cases = [
-        {"color": "#ff0000", "marker_shape": "circle", "dot_shape": "square"},
-        {"color": "#00ff00", "marker_shape": "rounded", "dot_shape": "circle"},
-        {"color": "#0000ff", "marker_shape": "square", "dot_shape": "rounded"}
-    ]
-    
-    for i, case in enumerate(test_cases):
+    for i, future in enumerate(case_futures):
         try:
-            params = {
-                "name": f"Test User {i+1}",
-                **case
-            }
-            
-            response = requests.get(f"{API_URL}/download-png", params=params, timeout=10)
-            tester.test_result(f"PNG download case {i+1}", 
+            response, _, _, _ = future.result()
+            TESTER.test_result(f"PNG download case {i+1}", 
                               response.status_code == 200,
                               f"Status: {response.status_code}")
         except Exception as e:
-            tester.test_result(f"PNG download case {i+1}", False, str(e))
-    
-    return tester
+            TESTER.test_result(f"PNG download case {i+1}", False, str(e))
 
 def test_svg_download():
     """Test GET /api/download-svg endpoint"""
-    tester = QRCodeTester()
+    # Send every request up front, then check the responses in order
+    basic_params = {
+        "name": "Antoine Moreau",
+        "phone": "+33 2 11 22 33 44",
+        "email": "antoine.moreau@example.fr",
+        "company": "Digital Agency",
+        "title": "Designer UX/UI",
+        "color": "#9900cc",
+        "marker_shape": "rounded",
+        "dot_shape": "rounded"
+    }
+    basic_check = XMLCheck()
+    basic_future = submit_download("/download-svg", basic_params, basic_check.feed)
+    
+    shape_futures = []
+    for shape in SHAPES:
+        params = {
+            "name": f"Test {shape.title()}",
+            "marker_shape": shape,
+            "dot_shape": shape,
+            "color": "#444444"
+        }
+        shape_futures.append((shape, submit_download("/download-svg", params)))
     
     # Test 1: Basic SVG download
     try:
-        params = {
-            "name": "Antoine Moreau",
-            "phone": "+33 2 11 22 33 44",
-            "email": "antoine.moreau@example.fr",
-            "company": "Digital Agency",
-            "title": "Designer UX/UI",
-            "color": "#9900cc",
-            "marker_shape": "rounded",
-            "dot_shape": "rounded"
-        }
-        
-        response = requests.get(f"{API_URL}/download-svg", params=params, timeout=10)
-        tester.test_result("SVG download", 
+        response, head, _, digest = basic_future.result()
+        TESTER.test_result("SVG download", 
                           response.status_code == 200,
                           f"Status: {response.status_code}")
         
         if response.status_code == 200:
-            tester.test_result("SVG content type", 
+            TESTER.test_result("SVG content type", 
                               response.headers.get('content-type') == 'image/svg+xml',
                               f"Content-Type: {response.headers.get('content-type')}")
             
             # Check filename in Content-Disposition header
             content_disposition = response.headers.get('content-disposition', '')
-            tester.test_result("SVG filename contains FoxVelocityCreation", 
+            TESTER.test_result("SVG filename contains FoxVelocityCreation", 
                               'FoxVelocityCreation.svg' in content_disposition,
                               f"Content-Disposition: {content_disposition}")
             
+            # Downloads are deterministic, so clients may cache them
+            cache_control = response.headers.get('cache-control', '')
+            TESTER.test_result("SVG download is cacheable", 
+                              'public' in cache_control and 'max-age' in cache_control,
+                              f"Cache-Control: {cache_control}")
+            
             # Validate SVG content
-            svg_content = response.text
-            tester.test_result("SVG download content is valid", 
-                              svg_content.startswith('<?xml') and '<svg' in svg_content,
+            TESTER.test_result("SVG download content is valid", 
+                              head.startswith(b'<?xml') and b'<svg' in head,
                               "Invalid SVG format")
             
-            # Try to parse as XML
-            try:
-                ET.fromstring(svg_content)
-                tester.test_result("Downloaded SVG is well-formed XML", True)
-            except ET.ParseError as e:
-                tester.test_result("Downloaded SVG is well-formed XML", False, str(e))
+            # The body was parsed chunk by chunk as it streamed in
+            basic_check.feed(b"", True)
+            TESTER.test_result("Downloaded SVG is well-formed XML", not basic_check.error, basic_check.error)
+            
+            # The server announces the hash of the body it sent
+            expected = response.headers.get(QR_HASH_HEADER, '')
+            TESTER.test_result("SVG download matches X-QR-Sha256", 
+                              digest == expected,
+                              f"Header: {expected}, body: {digest}")
                 
     except Exception as e:
-        tester.test_result("SVG download", False, str(e))
+        TESTER.test_result("SVG download", False, str(e))
     
     # Test 2: Different shapes
-    shapes = ["square", "circle", "rounded"]
-    for shape in shapes:
+    for shape, future in shape_futures:
         try:
-            params = {
-                "name": f"Test {shape.title()}",
-                "marker_shape": shape,
-                "dot_shape": shape,
-                "color": "#444444"
-            }
-            
-            response = requests.get(f"{API_URL}/download-svg", params=params, timeout=10)
-            tester.test_result(f"SVG download with {shape} shapes", 
+            response, _, _, _ = future.result()
+            TESTER.test_result(f"SVG download with {shape} shapes", 
                               response.status_code == 200,
                               f"Status: {response.status_code}")
         except Exception as e:
-            tester.test_result(f"SVG download with {shape} shapes", False, str(e))
-    
-    return tester
+            TESTER.test_result(f"SVG download with {shape} shapes", False, str(e))
 
 def test_error_handling():
     """Test error handling scenarios"""
-    tester = QRCodeTester()
+    # Send every request up front, then check the responses in order
+    invalid_color_future = submit_post("/qr-code", {
+        "name": "Test User",
+        "color": "invalid-color",
+        "marker_shape": "square",
+        "dot_shape": "square"
+    })
+    invalid_shape_future = submit_post("/qr-code", {
+        "name": "Test User",
+        "color": "#000000",
+        "marker_shape": "invalid-shape",
+        "dot_shape": "square"
+    })
+    invalid_logo_future = submit_post("/qr-code", {
+        "name": "Test User",
+        "color": "#000000",
+        "logo_base64": "invalid-base64-data"
+    })
+    out_of_range_color_futures = [
+        submit_post(endpoint, {"name": "Test User", "color": "rgb(300,0,0)"})
+        for endpoint in ("/qr-code", "/qr-code-svg")
+    ]
+    oversized_batch_future = submit_post("/qr-code-batch", [{"name": "Test User"}] * 65)
+    oversized_future = submit_post("/qr-code", {
+        "name": "X" * 3000,
+        "color": "#000000"
+    })
     
     # Test 1: Invalid color format (should still work or handle gracefully)
     try:
-        payload = {
-            "name": "Test User",
-            "color": "invalid-color",
-            "marker_shape": "square",
-            "dot_shape": "square"
-        }
-        
-        response = requests.post(f"{API_URL}/qr-code", json=payload, timeout=10)
+        response = invalid_color_future.result()
         # This should either work (fallback to default) or return an error
-        tester.test_result("Invalid color handling", 
+        TESTER.test_result("Invalid color handling", 
                           response.status_code in [200, 400, 422],
                           f"Status: {response.status_code}")
     except Exception as e:
-        tester.test_result("Invalid color handling", False, str(e))
+        TESTER.test_result("Invalid color handling", False, str(e))
     
     # Test 2: Invalid shape
     try:
-        payload = {
-            "name": "Test User",
-            "color": "#000000",
-            "marker_shape": "invalid-shape",
-            "dot_shape": "square"
-        }
-        
-        response = requests.post(f"{API_URL}/qr-code", json=payload, timeout=10)
-        tester.test_result("Invalid shape handling", 
+        response = invalid_shape_future.result()
+        TESTER.test_result("Invalid shape handling", 
                           response.status_code in [200, 400, 422],
                           f"Status: {response.status_code}")
     except Exception as e:
-        tester.test_result("Invalid shape handling", False, str(e))
+        TESTER.test_result("Invalid shape handling", False, str(e))
     
     # Test 3: Invalid logo base64
     try:
-        payload = {
-            "name": "Test User",
-            "color": "#000000",
-            "logo_base64": "invalid-base64-data"
-        }
-        
-        response = requests.post(f"{API_URL}/qr-code", json=payload, timeout=10)
+        response = invalid_logo_future.result()
         # Should handle gracefully (ignore logo or return error)
-        tester.test_result("Invalid logo base64 handling", 
+        TESTER.test_result("Invalid logo base64 handling", 
                           response.status_code in [200, 400, 422],
                           f"Status: {response.status_code}")
     except Exception as e:
-        tester.test_result("Invalid logo base64 handling", False, str(e))
+        TESTER.test_result("Invalid logo base64 handling", False, str(e))
+    
+    # Test 4: Data too long for any QR version must be rejected, not truncated
+    try:
+        response = oversized_future.result()
+        TESTER.test_result("Oversized data rejected", 
+                          response.status_code == 400,
+                          f"Status: {response.status_code}")
+    except Exception as e:
+        TESTER.test_result("Oversized data rejected", False, str(e))
+    
+    # Test 5: Batches above the size limit are rejected before any work is queued
+    try:
+        response = oversized_batch_future.result()
+        TESTER.test_result("Oversized batch rejected", 
+                          response.status_code == 422,
+                          f"Status: {response.status_code}")
+    except Exception as e:
+        TESTER.test_result("Oversized batch rejected", False, str(e))
     
-    return tester
+    # Test 6: Out-of-range color channels fall back to black in PNG and SVG
+    try:
+        png_response, svg_response = (future.result() for future in out_of_range_color_futures)
+        statuses = [png_response.status_code, svg_response.status_code]
+        TESTER.test_result("Out-of-range color handling", 
+                          statuses == [200, 200] and 'fill="#000000"' in svg_response.json()["svg_content"],
+                          f"Statuses: {statuses}")
+    except Exception as e:
+        TESTER.test_result("Out-of-range color handling", False, str(e))
 
 def test_vcard_format():
     """Test vCard format compliance"""
-    tester = QRCodeTester()
-    
     try:
         payload = {
             "name": "Émilie Rousseau",
@@ -515,107 +661,109 @@ def test_vcard_format():
             "url_home": "https://emilie-rousseau.com"
         }
         
-        response = requests.post(f"{API_URL}/qr-code", json=payload, timeout=10)
+        response = CLIENT.post("/api/qr-code", content=_dumps(payload), headers=JSON_HEADERS)
         
         if response.status_code == 200:
             data = response.json()
             vcard = data.get("vcard_content", "")
             
             # Test vCard format compliance
-            tester.test_result("vCard starts with BEGIN:VCARD", 
+            TESTER.test_result("vCard starts with BEGIN:VCARD", 
                               vcard.startswith("BEGIN:VCARD"),
                               "vCard doesn't start with BEGIN:VCARD")
             
-            tester.test_result("vCard ends with END:VCARD", 
+            TESTER.test_result("vCard ends with END:VCARD", 
                               vcard.strip().endswith("END:VCARD"),
                               "vCard doesn't end with END:VCARD")
             
-            tester.test_result("vCard contains VERSION", 
+            TESTER.test_result("vCard contains VERSION", 
                               "VERSION:" in vcard,
                               "vCard missing VERSION field")
             
-            tester.test_result("vCard contains FN (Full Name)", 
+            TESTER.test_result("vCard contains FN (Full Name)", 
                               "FN:" in vcard,
                               "vCard missing FN field")
             
             # Test specific data
-            tester.test_result("vCard contains correct name", 
+            TESTER.test_result("vCard contains correct name", 
                               "Émilie Rousseau" in vcard,
                               "Name not found in vCard")
             
-            tester.test_result("vCard contains correct email", 
+            TESTER.test_result("vCard contains correct email", 
                               "emilie.rousseau@example.fr" in vcard,
                               "Email not found in vCard")
             
-            tester.test_result("vCard contains correct company", 
+            TESTER.test_result("vCard contains correct company", 
                               "Créative Solutions" in vcard,
                               "Company not found in vCard")
             
         else:
-            tester.test_result("vCard format test", False, f"Status: {response.status_code}")
+            TESTER.test_result("vCard format test", False, f"Status: {response.status_code}")
             
     except Exception as e:
-        tester.test_result("vCard format test", False, str(e))
-    
-    return tester
+        TESTER.test_result("vCard format test", False, str(e))
 
 def main():
     """Run all tests"""
     print("🚀 Starting QR Code Generator Backend Tests")
     print("=" * 60)
     
-    all_testers = []
-    
-    # Run all test suites
-    print("\n📡 Testing Basic Connectivity...")
-    all_testers.append(test_basic_connectivity())
-    
-    print("\n🎯 Testing QR Code Generation (POST /api/qr-code)...")
-    all_testers.append(test_qr_code_generation())
+    # Throwaway request so that connection setup and the backend's cold path
+    # are not billed to the first suite; the sample logo is built meanwhile
+    warmup = submit_post("/qr-code", {"name": "warm"})
+    create_sample_logo_base64()
+    try:
+        warmup.result()
+    except httpx.HTTPError:
+        pass
     
-    print("\n🎨 Testing SVG QR Code Generation (POST /api/qr-code-svg)...")
-    all_testers.append(test_qr_code_svg_generation())
+    suites = [
+        ("\n📡 Testing Basic Connectivity...", test_basic_connectivity),
+        ("\n🎯 Testing QR Code Generation (POST /api/qr-code)...", test_qr_code_generation),
+        ("\n🎨 Testing SVG QR Code Generation (POST /api/qr-code-svg)...", test_qr_code_svg_generation),
+        ("\n📥 Testing PNG Download (GET /api/download-png)...", test_png_download),
+        ("\n📄 Testing SVG Download (GET /api/download-svg)...", test_svg_download),
+        ("\n🔧 Testing vCard Format...", test_vcard_format),
+        ("\n⚠️  Testing Error Handling...", test_error_handling),
+    ]
     
-    print("\n📥 Testing PNG Download (GET /api/download-png)...")
-    all_testers.append(test_png_download())
+    # Run all test suites, writing each one's output in a single block
+    for header, suite in suites:
+        suite()
+        TESTER.flush(header)
     
-    print("\n📄 Testing SVG Download (GET /api/download-svg)...")
-    all_testers.append(test_svg_download())
+    # Overall summary
+    total_passed = TESTER.passed
+    total_failed = TESTER.failed
+    all_errors = TESTER.errors
     
-    print("\n🔧 Testing vCard Format...")
-    all_testers.append(test_vcard_format())
+    POOL.shutdown()
+    CLIENT.close()
     
-    print("\n⚠️  Testing Error Handling...")
-    all_testers.append(test_error_handling())
+    success_rate = (total_passed / (total_passed + total_failed)) * 100 if (total_passed + total_failed) > 0 else 0
     
-    # Overall summary
-    total_passed = sum(t.passed for t in all_testers)
-    total_failed = sum(t.failed for t in all_testers)
-    all_errors = []
-    for t in all_testers:
-        all_errors.extend(t.errors)
-    
-    print(f"\n{'='*60}")
-    print(f"🏁 FINAL TEST SUMMARY")
-    print(f"{'='*60}")
-    print(f"✅ Total Passed: {total_passed}")
-    print(f"❌ Total Failed: {total_failed}")
-    print(f"📊 Total Tests: {total_passed + total_failed}")
+    lines = [
+        f"\n{'='*60}",
+        "🏁 FINAL TEST SUMMARY",
+        f"{'='*60}",
+        f"✅ Total Passed: {total_passed}",
+        f"❌ Total Failed: {total_failed}",
+        f"📊 Total Tests: {total_passed + total_failed}",
+    ]
     
     if all_errors:
-        print(f"\n🚨 CRITICAL ERRORS:")
-        for error in all_errors:
-            print(f"  - {error}")
+        lines.append("\n🚨 CRITICAL ERRORS:")
+        lines.extend(f"  - {error}" for error in all_errors)
     
-    success_rate = (total_passed / (total_passed + total_failed)) * 100 if (total_passed + total_failed) > 0 else 0
-    print(f"\n📈 Success Rate: {success_rate:.1f}%")
+    lines.append(f"\n📈 Success Rate: {success_rate:.1f}%")
     
     if total_failed == 0:
-        print("🎉 All tests passed! Backend is working correctly.")
-        return True
+        lines.append("🎉 All tests passed! Backend is working correctly.")
     else:
-        print(f"⚠️  {total_failed} tests failed. Please check the errors above.")
-        return False
+        lines.append(f"⚠️  {total_failed} tests failed. Please check the errors above.")
+    sys.stdout.write("\n".join(lines) + "\n")
+    
+    return total_failed == 0
 
 if __name__ == "__main__":
     success = main()
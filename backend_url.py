@@ -0,0 +1,17 @@
+"""
+Backend URL lookup shared by the test scripts
+"""
+
+import functools
+
+# Get backend URL from frontend .env file
+@functools.lru_cache(maxsize=1)
+def get_backend_url():
+    try:
+        with open('/app/frontend/.env', 'r') as f:
+            env = dict(line.strip().split('=', 1) for line in f if '=' in line)
+        if 'REACT_APP_BACKEND_URL' in env:
+            return env['REACT_APP_BACKEND_URL']
+    except:
+        pass
+    return "http://localhost:8001"
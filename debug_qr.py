@@ -3,13 +3,34 @@
 Simple test to isolate QR code generation issue
 """
 
+import argparse
+import hashlib
+import itertools
 import sys
 sys.path.append('/app/backend')
 
+try:
+    import diskcache
+except ImportError:  # diskcache is optional, without it every run calls make()
+    diskcache = None
+
+import qr_generator
 from qr_generator import QRGenerator, ErrorCorrectionLevel, generate_vcard, create_qr_image, create_qr_svg
 
-def test_basic_qr_generation():
+# Matrices built by earlier runs, kept on disk between invocations; only
+# used with --cache so that by default every run exercises make()
+CACHE_DIR = '/tmp/qr_debug_cache'
+
+def generator_fingerprint():
+    """Hash of the generator source, so editing it invalidates cached matrices"""
+    with open(qr_generator.__file__, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def test_basic_qr_generation(use_cache=False):
     print("Testing basic QR code generation...")
+    cache = diskcache.Cache(CACHE_DIR) if use_cache and diskcache is not None else None
+    if use_cache and cache is None:
+        print("⚠️  diskcache is not installed, running without the cache")
     
     try:
         # Test vCard generation
@@ -38,8 +59,18 @@ def test_basic_qr_generation():
         
         # Test make (this is where the error likely occurs)
         print("4. Testing make...")
-        qr.make()
-        print("✅ make successful")
+        key = ("qr_state", generator_fingerprint(), vcard, qr.error_correction.name)
+        cached = cache.get(key) if cache is not None else None
+        if cached is None:
+            qr.make()
+            if cache is not None:
+                cache.set(key, (qr.modules, qr.module_count, qr.version, qr.mask_pattern))
+            print("✅ make successful")
+            source = "one make()"
+        else:
+            qr.modules, qr.module_count, qr.version, qr.mask_pattern = cached
+            print("⏭️  make NOT tested, matrix loaded from cache (run without --cache to test it)")
+            source = "the cached matrix"
         
         # Test image creation
         print("5. Testing image creation...")
@@ -63,6 +94,24 @@ def test_basic_qr_generation():
         print("✅ SVG creation successful")
         print(f"SVG content length: {len(svg_content)}")
         
+        # Render every shape variant from the same matrix
+        print("7. Testing shape variants...")
+        shapes = ["square", "circle", "rounded"]
+        for marker_shape, dot_shape in itertools.product(shapes, shapes):
+            create_qr_image(
+                qr_generator=qr,
+                color="#000000",
+                marker_shape=marker_shape,
+                dot_shape=dot_shape
+            )
+            create_qr_svg(
+                qr_generator=qr,
+                color="#000000",
+                marker_shape=marker_shape,
+                dot_shape=dot_shape
+            )
+        print(f"✅ {len(shapes) ** 2} shape variants rendered from {source}")
+        
         print("\n🎉 All tests passed!")
         return True
         
@@ -73,4 +122,8 @@ def test_basic_qr_generation():
         return False
 
 if __name__ == "__main__":
-    test_basic_qr_generation()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--cache", action="store_true",
+                        help=f"reuse matrices from earlier runs stored in {CACHE_DIR} (skips make())")
+    args = parser.parse_args()
+    test_basic_qr_generation(use_cache=args.cache)
\ No newline at end of file
@@ -6,8 +6,36 @@ Debug QR code generation step by step
 import sys
 sys.path.append('/app/backend')
 
+import numpy as np
+
 from qr_generator import QRGenerator, ErrorCorrectionLevel, generate_vcard
 
+def read_back(qr):
+    """Recover the encoded bytes from a finished matrix"""
+    # Undo the mask and read the data modules in placement order
+    unmasked = qr.modules ^ (qr._mask_patterns()[qr.mask_pattern] & ~qr._fmask)
+    rows, cols = qr._traversal().T
+    free = ~qr._fmask[rows, cols]
+    
+    # De-interleave the data codewords back into their blocks
+    ec_count, groups = qr.ec_blocks[qr.version][qr.error_correction.name]
+    sizes = [size for count, size in groups for _ in range(count)]
+    codewords = np.packbits(unmasked[rows[free], cols[free]][:8 * sum(sizes)])
+    blocks = [[] for _ in sizes]
+    position = 0
+    for column in range(max(sizes)):
+        for block, size in zip(blocks, sizes):
+            if column < size:
+                block.append(codewords[position])
+                position += 1
+    stream = np.unpackbits(np.array([c for block in blocks for c in block], dtype=np.uint8))
+    
+    # Byte mode header: 4-bit mode, then an 8 or 16-bit character count
+    count_bits = 8 if qr.version < 10 else 16
+    count = int(''.join(map(str, stream[4:4 + count_bits])), 2)
+    start = 4 + count_bits
+    return np.packbits(stream[start:start + 8 * count]).tobytes()
+
 def debug_qr_step_by_step():
     print("Debugging QR code generation step by step...")
     
@@ -30,17 +58,18 @@ def debug_qr_step_by_step():
         
         # Initialize matrix
         qr.module_count = qr.version_info[qr.version]["size"]
-        qr.modules = [[False for _ in range(qr.module_count)] for _ in range(qr.module_count)]
+        qr.modules = np.zeros((qr.module_count, qr.module_count), dtype=np.uint8)
         print(f"Module count: {qr.module_count}")
-        print(f"Matrix initialized: {len(qr.modules)}x{len(qr.modules[0])}")
+        print(f"Matrix initialized: {qr.modules.shape[0]}x{qr.modules.shape[1]}")
         
         # Test function patterns
         print("Testing function patterns...")
         qr._place_finder_patterns()
-        qr._place_separators()
         qr._place_timing_patterns()
+        qr._place_alignment_patterns()
+        qr._place_version_info()
         qr._place_dark_module()
-        qr._place_format_info()
+        qr._build_function_mask()
         print("✅ Function patterns placed")
         
         # Test data encoding
@@ -62,7 +91,33 @@ def debug_qr_step_by_step():
         # Test mask application
         print("Testing mask application...")
         qr._apply_mask()
-        print("✅ Mask application successful")
+        print(f"✅ Mask application successful (mask pattern {qr.mask_pattern})")
+        
+        # Format info records the chosen mask, so it goes in last
+        print("Testing format info...")
+        qr._place_format_info()
+        print(f"✅ Format info placed: {qr._generate_format_info():05b}")
+        
+        # Test that the payload survives encoding without loss
+        print("Testing round trip...")
+        decoded = read_back(qr)
+        assert decoded == test_data.encode('utf-8'), f"Read back {decoded!r}"
+        
+        vcard = generate_vcard(
+            name="Jean Dupont",
+            phone="+33 1 23 45 67 89",
+            email="jean.dupont@example.com",
+            company="FoxVelocity Creation",
+            title="Développeur Senior",
+            url_work="https://foxvelocity.com",
+            url_home="https://jeandupont.fr"
+        )
+        vcard_qr = QRGenerator(version=1, error_correction=ErrorCorrectionLevel.H)
+        vcard_qr.add_data(vcard)
+        vcard_qr.make()
+        decoded = read_back(vcard_qr)
+        assert decoded == vcard.encode('utf-8'), f"vCard lost data: read back {len(decoded)} bytes"
+        print(f"✅ Round trip successful ({len(vcard.encode('utf-8'))}-byte vCard in version {vcard_qr.version})")
         
         print("\n🎉 All steps completed successfully!")
         return True
@@ -6,16 +6,7 @@ Quick test for invalid color handling
 import requests
 import json
 
-# Get backend URL from frontend .env file
-def get_backend_url():
-    try:
-        with open('/app/frontend/.env', 'r') as f:
-            for line in f:
-                if line.startswith('REACT_APP_BACKEND_URL='):
-                    return line.split('=', 1)[1].strip()
-    except:
-        pass
-    return "http://localhost:8001"
+from backend_url import get_backend_url
 
 BASE_URL = get_backend_url()
 API_URL = f"{BASE_URL}/api"
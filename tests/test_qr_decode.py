@@ -0,0 +1,62 @@
+"""
+Decode generated QR codes with a real decoder (zxing-cpp)
+"""
+
+import base64
+import io
+import sys
+from pathlib import Path
+
+import pytest
+from PIL import Image, ImageDraw
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+from qr_generator import QRGenerator, ErrorCorrectionLevel, generate_vcard, create_qr_png
+
+zxingcpp = pytest.importorskip("zxingcpp")
+
+FULL_VCARD = generate_vcard(
+    name="Jean Dupont",
+    phone="+33 1 23 45 67 89",
+    email="jean.dupont@example.com",
+    company="FoxVelocity Creation",
+    title="Développeur Senior",
+    url_work="https://foxvelocity.com",
+    url_home="https://jeandupont.fr"
+)
+EMPTY_VCARD = generate_vcard("", "", "", "", "", "", "")
+
+# Payloads spanning small, alignment-pattern and version-info symbols
+PAYLOADS = ["Hello World", EMPTY_VCARD, FULL_VCARD, "x" * 1000]
+
+def make_qr(data, error_correction=ErrorCorrectionLevel.H):
+    qr = QRGenerator(version=1, error_correction=error_correction)
+    qr.add_data(data)
+    qr.make()
+    return qr
+
+def decode(png):
+    """Texts of every QR code the decoder finds in a PNG"""
+    return [result.text for result in zxingcpp.read_barcodes(Image.open(io.BytesIO(png)))]
+
+@pytest.mark.parametrize("dot_shape", ["square", "circle", "rounded"])
+@pytest.mark.parametrize("data", PAYLOADS)
+def test_png_decodes(data, dot_shape):
+    png = create_qr_png(make_qr(data), color="#2050a0", marker_shape="square", dot_shape=dot_shape)
+    assert decode(png) == [data]
+
+@pytest.mark.parametrize("level", list(ErrorCorrectionLevel))
+def test_png_decodes_at_every_level(level):
+    png = create_qr_png(make_qr(FULL_VCARD, level))
+    assert decode(png) == [FULL_VCARD]
+
+def test_png_with_logo_decodes():
+    logo = Image.new('RGBA', (50, 50), (255, 255, 255, 0))
+    ImageDraw.Draw(logo).ellipse([5, 5, 45, 45], fill=(255, 0, 0, 255))
+    buffer = io.BytesIO()
+    logo.save(buffer, format='PNG')
+    logo_base64 = f"data:image/png;base64,{base64.b64encode(buffer.getvalue()).decode()}"
+    
+    png = create_qr_png(make_qr(FULL_VCARD), logo_base64=logo_base64, logo_size=25)
+    assert decode(png) == [FULL_VCARD]